@@ -2,11 +2,20 @@
 # Copyright (C) 2016 Andras Szell
 
 import sys
+import re
 import time
 import os
 import os.path
 import logging
+import Queue
+import argparse
+import multiprocessing
+from functools import partial
+from cStringIO import StringIO
+from array import array
 from collections import OrderedDict
+from bisect import bisect_left, bisect_right
+from itertools import izip, count
 from ConfigParser import ConfigParser, DuplicateSectionError
 
 from PySide.QtGui import QApplication, QMainWindow, QFileDialog, QAction, QMessageBox, QDialog, QIcon
@@ -14,8 +23,19 @@ from PySide import QtGui, QtCore
 
 from ui_mainwindow import Ui_MainWindow
 from ui_options import Ui_OptionsDialog
-
-from prop import propread, propsave, TransItem
+from ui_issues import Ui_IssuesDialog
+
+from prop import propread, propmap, propparse_chunks, propserialize, proppatch, propreorder, keys_in_order, reorder_keys, atomic_write, PropSpans, TransItem, LazyPropDict
+from cache import ParseCache
+from project import Project, find_base
+from tm import TranslationMemory
+from consistency import ConsistencyIndex
+from lint import LintIndex, RULE_NAMES
+from undo import UndoStack
+from journal import EditJournal
+from outdated import BaseSnapshot, load_base
+from timing import timings
+from search import SearchIndex, SearchQuery, ALL_COLUMNS, KEY, ORIGINAL, TRANSLATION
 
 VERSION_STR = "apropy v0.0.2 alpha"
 
@@ -23,8 +43,20 @@ ININAME = 'apropy.ini'
 ORIG_BASENAME = 'msg_bundle.properties'
 TRANS_BASENAME = 'msg_bundle_hu.properties'
 LOG_FNAME = 'apropy.log'
+CACHE_DIRNAME = 'apropy_cache'
 
 DEBUG_ROWLIMIT = None
+FILTER_DELAY = 250      # ms to wait after the last key press before filtering
+WATCH_DELAY = 500       # ms to wait after a file changed on disk before reading it
+SEARCH_SCOPES = [ALL_COLUMNS, (KEY,), (ORIGINAL,), (TRANSLATION,)]   # items of scopeCombo
+SUGGESTIONS = 5         # translation memory matches shown
+ISSUES_SHOWN = 5000     # lint issues listed at most
+JOURNAL_DELAY = 1000    # ms edits are queued before they are written to the journal
+READOUT_INTERVAL = 1000 # ms between updates of the timing readout of the status bar
+READOUT_SPANS = ['load', 'parse', 'fill_model', 'outdated', 'filter', 'checkpoint', 'save', 'paint']
+
+# set up by setup_logging when run as the application, the model is also used by benchmark.py
+logger = logging.getLogger("apropy")
 
 def error_popup(msg):
     msgBox = QMessageBox()
@@ -72,85 +104,794 @@ class TableDelegate(QtGui.QStyledItemDelegate):
             if option.state & QtGui.QStyle.State_Selected:
                 option.state &= ~ QtGui.QStyle.State_Selected
 
-class HighlightModel(QtGui.QStandardItemModel):
-    def __init__(self, *args, **kwargs):
-        super(HighlightModel, self).__init__(*args, **kwargs)
-        self.backup = []
-        
-    def data(self, index, role):
+class HighlightModel(QtCore.QAbstractTableModel):
+    '''
+    Key, original and translation columns read directly from the origins and trans dictionaries,
+    so no Qt items are created per key. Translated rows are greyed out, rows changed since
+    the last checkpoint are green.
+    The state of each row is computed when it is first painted and kept until the row changes,
+    so data() is only a few lookups.
+    Only the keys edited since the checkpoint are tracked, with the translation they have in the file.
+    Translations of other locales can be shown read-only in columns after the translation.
+    Keys with issues found by the LintIndex are marked with an icon, the issues are in the tooltip.
+    Edits are recorded in an UndoStack, a call of set_translation(s) being one step.
+    Translations whose original changed since they were saved (see BaseSnapshot) are orange instead
+    of grey, the old original is in the tooltip of the original.
+    '''
+    HEADERS = ['Key', 'Original', 'Translation']
+
+    # number of keys differing from the checkpoint
+    dirty_changed = QtCore.Signal(int)
+
+    # row state bits, 0 means not computed yet
+    VALID = 1
+    TRANSLATED = 2      # translation is not empty
+    CHANGED = 4         # translation differs from the checkpoint
+    EMPTY = 8           # translation is empty or spaces only
+    OUTDATED = 16       # original changed since the translation was saved
+
+    CHANGED_COLOR = QtGui.QColor(0, 180, 0, 255)
+    TRANSLATED_COLOR = QtGui.QColor(130, 130, 130, 255)
+    OUTDATED_COLOR = QtGui.QColor(220, 120, 0, 255)
+
+    def __init__(self, parent=None):
+        super(HighlightModel, self).__init__(parent)
+        self.dirty = {}     # key -> translation in the checkpoint, for the keys changed since
+        self.origins = OrderedDict()
+        self.trans = OrderedDict()
+        self.keys = []      # key of each row
+        self.rows = {}      # row of each key
+        self.states = array('B')    # state bits of each row
+        self.columns = []   # (locale name, items) of the extra columns
+        # called with (key, translation) when a translation is set, must update self.trans
+        self.updater = None
+        self.lint = None    # LintIndex of the rows, kept current by the updater
+        self.base = None    # BaseSnapshot of the translations, kept current by the updater
+        self.history = UndoStack()
+        self.issue_icon = QApplication.style().standardIcon(QtGui.QStyle.SP_MessageBoxWarning)
+
+        # do with stylesheet instead?
+        self.key_font = QtGui.QFont()
+        self.key_font.setBold(True)
+
+    def set_rows(self, origins, trans, keys):
+        ''' Show the given keys of the dictionaries '''
+        self.beginResetModel()
+        self.origins = origins
+        self.trans = trans
+        self.keys = keys
+        self.rows = dict(izip(keys, count()))
+        self.states = array('B', [0]) * len(keys)
+        self.endResetModel()
+
+    def set_columns(self, columns):
+        ''' Show the translations of other locales too, given as (locale name, items) pairs '''
+        self.beginResetModel()
+        self.columns = columns
+        self.endResetModel()
+
+    def append_rows(self, keys):
+        ''' Show the given keys too, after the others '''
+        if not keys:
+            return
+        first = len(self.keys)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(keys) - 1)
+        self.keys.extend(keys)
+        self.rows.update(izip(keys, count(first)))
+        self.states.extend(array('B', [0]) * len(keys))
+        self.endInsertRows()
+
+    def insert_rows(self, keys, order):
+        '''
+        Show the given keys too, at their place in order, e.g. the keys of the file
+        :param order: dict of key -> position, of the keys shown and the given ones
+        :return: False if the keys shown are not in that order, nothing is inserted then
+        '''
+        final = sorted(self.keys + keys, key=order.__getitem__)
+        new = set(keys)
+        if [k for k in final if k not in new] != self.keys:
+            return False
+        rows = [row for row, key in enumerate(final) if key in new]
+        # contiguous ranges from the start, the rows before them are in place already
+        i = 0
+        while i < len(rows):
+            j = i
+            while j + 1 < len(rows) and rows[j + 1] == rows[j] + 1:
+                j += 1
+            first, last = rows[i], rows[j]
+            self.beginInsertRows(QtCore.QModelIndex(), first, last)
+            self.keys[first:first] = final[first:last + 1]
+            self.states[first:first] = array('B', [0]) * (last - first + 1)
+            self.endInsertRows()
+            i = j + 1
+        self.rows = dict(izip(self.keys, count()))
+        return True
+
+    def remove_rows(self, keys):
+        ''' Stop showing the given keys '''
+        rows = sorted(self.rows[k] for k in keys if k in self.rows)
+        # contiguous ranges from the end, so the rows before them stay where they are
+        while rows:
+            first = last = rows.pop()
+            while rows and rows[-1] == first - 1:
+                first = rows.pop()
+            self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+            del self.keys[first:last + 1]
+            del self.states[first:last + 1]
+            self.endRemoveRows()
+        self.rows = dict(izip(self.keys, count()))
+
+    def state(self, row):
+        state = self.states[row]
+        if not state:
+            key = self.keys[row]
+            text = self.translation(row)
+            state = self.VALID
+            if text != '':
+                state |= self.TRANSLATED
+            if text.strip(' ') == '':
+                state |= self.EMPTY
+            if key in self.dirty:
+                state |= self.CHANGED
+            if self.base is not None and key in self.base.outdated:
+                state |= self.OUTDATED
+            self.states[row] = state
+        return state
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.keys)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS) + len(self.columns)
+
+    def key(self, row):
+        return self.keys[row]
+
+    def translation(self, row):
+        return self.key_translation(self.keys[row])
+
+    def key_translation(self, key):
+        item = self.trans.get(key)
+        return item.trans if item is not None else ''
+
+    def text(self, row, col):
+        key = self.keys[row]
+        if col == 0:
+            return key
+        elif col == 1:
+            return self.origins[key].trans
+        elif col == 2:
+            return self.translation(row)
+        else:
+            item = self.columns[col - len(self.HEADERS)][1].get(key)
+            return item.trans if item is not None else ''
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
         if not index.isValid():
             return None
         
-        currtrans = self.item(index.row(), 2)
-        itemdata = currtrans.text() if currtrans is not None else ''
-        itemkey = self.item(index.row(), 0).text()
-
-        if role == QtCore.Qt.DisplayRole:
-            curritem = self.item(index.row(), index.column())
-            return curritem.text() if curritem is not None else ''
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return self.text(index.row(), index.column())
+
+        if index.column() == 0 and self.lint is not None:
+            if role == QtCore.Qt.DecorationRole:
+                if self.lint.get(self.keys[index.row()]):
+                    return self.issue_icon
+            elif role == QtCore.Qt.ToolTipRole:
+                messages = self.lint.messages(self.keys[index.row()])
+                if messages:
+                    return u'\n'.join(messages)
+
+        if index.column() == 1 and role == QtCore.Qt.ToolTipRole and self.base is not None:
+            old = self.base.old.get(self.keys[index.row()])
+            if old is not None and self.state(index.row()) & self.OUTDATED:
+                return u'Changed since translated, it was:\n' + old
 
-        if role == QtCore.Qt.TextColorRole:
-            if index.column() < 2 and itemdata != "":
-                # if translation text is nonempty, it's either an unsaved modification...
-                if itemkey in self.backup and itemdata != self.backup[itemkey]:
-                    return QtGui.QColor(0, 180, 0, 255)
-                # ...or an already saved translated item
-                else:
-                    return QtGui.QColor(130, 130, 130, 255)
-            
-        # do with stylesheet instead?
-        if role == QtCore.Qt.FontRole:
-            if index.column() < 2:
-                font = QtGui.QFont()
-                font.setBold(True)
-                return font
+        if index.column() < 2:
+            if role == QtCore.Qt.TextColorRole:
+                state = self.state(index.row())
+                if state & self.TRANSLATED:
+                    # if translation text is nonempty, it's either an unsaved modification...
+                    if state & self.CHANGED:
+                        return self.CHANGED_COLOR
+                    # ...or a saved one whose original changed since...
+                    elif state & self.OUTDATED:
+                        return self.OUTDATED_COLOR
+                    # ...or an already saved translated item
+                    else:
+                        return self.TRANSLATED_COLOR
+
+            elif role == QtCore.Qt.FontRole:
+                return self.key_font
                         
-        return super(HighlightModel, self).data(index, role)
+        return None
 
-    def create_checkpoint(self, origins, trans):
-        ''' Stores all the current translations for later comparison '''
-        old_backup = self.backup
-        self.backup = {}
-        
-        for key in origins.keys():
-            self.backup[key] = '' if key not in trans else trans[key].trans
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if not index.isValid() or index.column() != 2 or role != QtCore.Qt.EditRole:
+            return False
+        self.set_translation(index.row(), value)
+        return True
+
+    def flags(self, index):
+        flags = QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+        if index.column() == 2:
+            flags |= QtCore.Qt.ItemIsEditable
+        return flags
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            if section < len(self.HEADERS):
+                return self.HEADERS[section]
+            if section < self.columnCount():
+                return self.columns[section - len(self.HEADERS)][0]
+        return super(HighlightModel, self).headerData(section, orientation, role)
+
+    def set_translation(self, row, text, merge=False):
+        ''' :param merge: undone together with the previous edit of the row if that was merged too,
+            for text typed character by character '''
+        self.history.record([self.update_key(self.keys[row], text)], merge)
+        self.row_changed(row)
+        self.dirty_changed.emit(len(self.dirty))
+
+    def set_translations(self, keys, text):
+        ''' Set the same translation for many keys (shown or not), signalled at once '''
+        self.history.record([self.update_key(key, text) for key in keys])
+        self.keys_changed(keys)
+        self.dirty_changed.emit(len(self.dirty))
+
+    def update_key(self, key, text):
+        ''' :return: (key, old translation, new translation) '''
+        old = self.key_translation(key)
+        saved = self.dirty.get(key, None)
+        if saved is None:
+            saved = old
+        self.updater(key, text)
+
+        # a key edited back to its checkpointed text is not dirty anymore
+        new = self.key_translation(key)
+        if new == saved:
+            self.dirty.pop(key, None)
+        else:
+            self.dirty[key] = saved
+        return key, old, new
+
+    def undo(self):
+        ''' Undo the last step, the rows are signalled at once
+        :return: keys changed '''
+        if not self.history.can_undo():
+            return []
+        step = self.history.undo()
+        return self.apply_texts([(key, old) for key, old, new in reversed(step)])
+
+    def redo(self):
+        ''' :return: keys changed '''
+        if not self.history.can_redo():
+            return []
+        return self.apply_texts([(key, new) for key, old, new in self.history.redo()])
+
+    def apply_texts(self, texts, record=False):
+        ''' Set (key, translation) pairs, signalled at once
+        :param record: as one undo step, undo and redo do not record what they apply '''
+        step = [self.update_key(key, text) for key, text in texts]
+        if record:
+            self.history.record(step)
+        keys = [key for key, text in texts]
+        self.keys_changed(keys)
+        self.dirty_changed.emit(len(self.dirty))
+        return keys
+
+    def row_changed(self, row):
+        self.states[row] = 0
+        self.dataChanged.emit(self.index(row, 0), self.index(row, 2))
+
+    def keys_changed(self, keys):
+        ''' Texts of many keys changed, signalled at once '''
+        rows = [self.rows[k] for k in keys if k in self.rows]
+        for row in rows:
+            self.states[row] = 0
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), 0), self.index(max(rows), self.columnCount() - 1))
+
+    def create_checkpoint(self, saved, reset=False):
+        ''' Stores translations as they are in the file for later comparison
+        :param saved: key -> translation ('' if none) written for the keys that were dirty
+        :param reset: the current translations are all in the file (after loading)
+        '''
+        if reset:
+            changed = self.dirty.keys()
+            self.dirty = {}
+            # edits of other files can not be undone
+            self.history.clear()
+        else:
+            changed = []
+            for key, text in saved.iteritems():
+                if self.key_translation(key) == text:
+                    if self.dirty.pop(key, None) is not None:
+                        changed.append(key)
+                else:
+                    # edited again while saving
+                    self.dirty[key] = text
 
-        for row in range(self.rowCount()):
-            key = self.item(row, 0).text()
-            text = self.item(row, 2).text()
+        # refresh the rows that were edited so green highlight is removed on save
+        for key in changed:
+            if key in self.rows:
+                self.row_changed(self.rows[key])
             
-            # emit datachanges for all rows that were edited so green highlight is removed on save
-            if key in old_backup and (key not in self.backup or old_backup[key] != self.backup[key]):
-                self.item(row, 0).emitDataChanged()
-                self.item(row, 1).emitDataChanged()
-            
-        logger.debug("Checkpoint contains %d items" % len(self.backup))
+        logger.debug("Checkpoint: %d items still changed" % len(self.dirty))
+        self.dirty_changed.emit(len(self.dirty))
 
-    def has_changes(self, origins, trans):
-        for key in origins.keys():
-            text = '' if key not in trans else trans[key].trans
-            
-            if text != self.backup[key]:
-                return True
-        return False
+    def has_changes(self):
+        return bool(self.dirty)
         
     def is_changed_idx(self, modelindex):
-        key = self.item(modelindex.row(), 0).text()
-        curr_trans = self.item(modelindex.row(), 2).text()
-        return self.backup[key] != curr_trans
+        return bool(self.state(modelindex.row()) & self.CHANGED)
         
     def is_empty(self, modelindex):
-        return self.itemFromIndex(modelindex).text().strip(' ') == ''
+        if modelindex.column() == 2:
+            return bool(self.state(modelindex.row()) & self.EMPTY)
+        return self.text(modelindex.row(), modelindex.column()).strip(' ') == ''
         
     def revert_translation(self, modelindex):
         row = modelindex.row()
-        key = self.item(row, 0).text()
-        currtrans = self.item(modelindex.row(), 2).text()
-        if key in self.backup and self.backup[key] != currtrans:
-            self.item(row, 2).setText(self.backup[key])
-            self.item(row, 0).emitDataChanged()
-            self.item(row, 1).emitDataChanged()
+        key = self.keys[row]
+        if key in self.dirty:
+            self.set_translation(row, self.dirty[key])
                     
+class FilterProxyModel(QtGui.QAbstractProxyModel):
+    '''
+    Shows the rows of the source HighlightModel whose keys are given to set_keys (all of them
+    if None), in source order. Rows are mapped through a list, so a new filter costs time
+    proportional to the number of rows shown instead of a filterAcceptsRow call for every row.
+    '''
+    def __init__(self, parent=None):
+        super(FilterProxyModel, self).__init__(parent)
+        self.filter_keys = None
+        self.source_rows = None     # source row of each row shown, None if no filtering
+        self.proxy_rows = {}        # row of each source row shown
+        self.removed = None         # proxy rows being removed
+
+    def setSourceModel(self, model):
+        super(FilterProxyModel, self).setSourceModel(model)
+        model.dataChanged.connect(self.on_source_data_changed)
+        model.modelAboutToBeReset.connect(self.on_source_about_to_be_reset)
+        model.modelReset.connect(self.on_source_reset)
+        model.rowsAboutToBeInserted.connect(self.on_source_rows_about_to_be_inserted)
+        model.rowsInserted.connect(self.on_source_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self.on_source_rows_about_to_be_removed)
+        model.rowsRemoved.connect(self.on_source_rows_removed)
+
+    def set_keys(self, keys):
+        ''' Show only the given keys (None: all of them), keeping the selection if possible '''
+        # same as QSortFilterProxyModel.invalidate()
+        self.layoutAboutToBeChanged.emit()
+        old = self.persistentIndexList()
+        sources = [self.mapToSource(index) for index in old]
+
+        self.filter_keys = keys
+        self.remap()
+
+        self.changePersistentIndexList(old, [self.mapFromSource(index) for index in sources])
+        self.layoutChanged.emit()
+
+    def remap(self):
+        if self.filter_keys is None:
+            self.source_rows = None
+            self.proxy_rows = {}
+        else:
+            rows = self.sourceModel().rows
+            self.source_rows = sorted(rows[k] for k in self.filter_keys if k in rows)
+            self.proxy_rows = dict(izip(self.source_rows, count()))
+
+    def on_source_about_to_be_reset(self):
+        self.beginResetModel()
+
+    def on_source_reset(self):
+        self.remap()
+        self.endResetModel()
+
+    def on_source_rows_about_to_be_inserted(self, parent, first, last):
+        # a filtered view shows the same rows, the ones after them move;
+        # the rows matching the filter are added by the next set_keys
+        if self.source_rows is None:
+            self.beginInsertRows(QtCore.QModelIndex(), first, last)
+
+    def on_source_rows_inserted(self, parent, first, last):
+        if self.source_rows is None:
+            self.endInsertRows()
+            return
+        lo = bisect_left(self.source_rows, first)
+        if lo < len(self.source_rows):
+            n = last - first + 1
+            self.source_rows = self.source_rows[:lo] + [row + n for row in self.source_rows[lo:]]
+            self.proxy_rows = dict(izip(self.source_rows, count()))
+
+    def on_source_rows_about_to_be_removed(self, parent, first, last):
+        if self.source_rows is None:
+            self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+            return
+        self.removed = bisect_left(self.source_rows, first), bisect_right(self.source_rows, last)
+        if self.removed[0] < self.removed[1]:
+            self.beginRemoveRows(QtCore.QModelIndex(), self.removed[0], self.removed[1] - 1)
+
+    def on_source_rows_removed(self, parent, first, last):
+        if self.source_rows is None:
+            self.endRemoveRows()
+            return
+        lo, hi = self.removed
+        n = last - first + 1
+        self.source_rows = self.source_rows[:lo] + [row - n for row in self.source_rows[hi:]]
+        self.proxy_rows = dict(izip(self.source_rows, count()))
+        if lo < hi:
+            self.endRemoveRows()
+
+    def on_source_data_changed(self, topleft, bottomright):
+        # a coalesced change may cover the whole table, it is passed on as one range too
+        if self.source_rows is None:
+            first, last = topleft.row(), bottomright.row()
+        else:
+            first = bisect_left(self.source_rows, topleft.row())
+            last = bisect_right(self.source_rows, bottomright.row()) - 1
+            if first > last:
+                return
+        self.dataChanged.emit(self.index(first, topleft.column()), self.index(last, bottomright.column()))
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.source_rows is None:
+            return self.sourceModel().rowCount()
+        return len(self.source_rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        if parent.isValid() or not (0 <= row < self.rowCount() and 0 <= column < self.columnCount()):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None:
+            # QObject.parent()
+            return super(FilterProxyModel, self).parent()
+        return QtCore.QModelIndex()
+
+    def mapToSource(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        row = index.row() if self.source_rows is None else self.source_rows[index.row()]
+        return self.sourceModel().index(row, index.column())
+
+    def mapFromSource(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        row = index.row() if self.source_rows is None else self.proxy_rows.get(index.row())
+        if row is None:
+            return QtCore.QModelIndex()
+        return self.index(row, index.column())
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Vertical and self.source_rows is not None:
+            if not 0 <= section < len(self.source_rows):
+                return None
+            section = self.source_rows[section]
+        return self.sourceModel().headerData(section, orientation, role)
+
+class SearchWorker(QtCore.QThread):
+    '''
+    Runs one filter query on the SearchIndex in a background thread. The first page of matches
+    is signalled as soon as it is found, the whole result when the scan ends. A cancelled worker
+    stops at its next check and signals nothing more.
+    '''
+    page = QtCore.Signal(int, object)
+    done = QtCore.Signal(int, object)
+    PAGE_SIZE = 200
+
+    def __init__(self, index, query, generation):
+        super(SearchWorker, self).__init__()
+        self.index = index
+        self.query = query
+        self.generation = generation
+        self.cancelled = False
+        self.elapsed = 0.0
+        self.matches = 0
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        start = time.time()
+        keys = self.index.search(self.query, lambda: self.cancelled, self.on_first_page, self.PAGE_SIZE)
+        self.elapsed = time.time() - start
+        if keys is not None and not self.cancelled:
+            self.matches = len(keys)
+            self.done.emit(self.generation, keys)
+
+    def on_first_page(self, keys):
+        if not self.cancelled:
+            self.page.emit(self.generation, keys)
+
+class LoadWorker(QtCore.QThread):
+    '''
+    Reads the translated file, then the original one in chunks in a background thread.
+    Results are put in the results queue in file order, followed by a progress signal:
+    ('trans', items, spans, stat, error) once, then ('origins', items, error) for every chunk,
+    then ('base', snapshot) with the outdated translations found (see outdated.load_base).
+    In lazy mode (see prop.propmap) both files are indexed in one piece. Files found in the
+    parse cache are loaded from there in one piece, parsed ones are stored in it.
+    In project mode the translated file is parsed together with the other locales of the project
+    in worker processes, the others follow the original file as ('locale', name, items, spans,
+    stat, error). All the keys and comments are interned in the project then, so lazy mode is off.
+    Otherwise the original and the translated file are interned in a table of the load only, so
+    the dictionaries share their keys and equal comments.
+    Keys defined more than once are collected in duplicates (not in lazy mode).
+    '''
+    progress = QtCore.Signal(int)
+    CHUNK = 1 << 19     # bytes of the original file parsed at once
+
+    def __init__(self, origname, transname, lazy=False, cache=None, project=None, locale=None):
+        super(LoadWorker, self).__init__()
+        self.origname = origname
+        self.transname = transname
+        self.project = project
+        self.locale = locale
+        self.lazy = lazy and project is None
+        self.cache = None if self.lazy else cache
+        self.strings = project.strings if project is not None else {}    # interning table
+        self.cached = []    # names of the files loaded from the cache
+        self.duplicates = {'original': [], 'translated': []}    # keys repeated in the files
+        self.results = Queue.Queue()
+        self.cancelled = False
+        self.elapsed = 0.0
+        # as loaded by the worker, compared by load_base
+        self.trans = None
+        self.origins = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        start = time.time()
+        locales = None
+        if self.project is not None:
+            names = [self.locale] + [name for name in self.project.locales if name != self.locale]
+            stats = dict((name, file_stat(self.project.locales[name])) for name in names)
+            # parsed in the background while the original file is read
+            locales = self.project.parse(names, self.cache)
+        try:
+            try:
+                if locales is not None:
+                    name, self.trans, spans, error = locales.next()
+                    self.duplicates['translated'] = self.project.duplicates.get(name, [])
+                    self.results.put(('trans', self.trans, spans, stats[name], error))
+                else:
+                    result = self.load_trans()
+                    self.trans = result[0]
+                    self.results.put(('trans',) + result + (None,))
+            except Exception, e:
+                self.results.put(('trans', None, None, None, e))
+            self.progress.emit(10)
+
+            try:
+                self.load_origins()
+            except Exception, e:
+                self.results.put(('origins', None, e))
+
+            if not self.cancelled and self.trans is not None and self.origins is not None:
+                try:
+                    with timings.span('outdated', self.transname):
+                        self.results.put(('base', load_base(self.transname, self.origins, self.trans)))
+                except Exception, e:
+                    logger.warn("Unable to find the outdated translations: %s" % e)
+            # kept by the main thread
+            self.trans = self.origins = None
+
+            if locales is not None:
+                for i, (name, trans, spans, error) in enumerate(locales):
+                    if self.cancelled:
+                        break
+                    self.results.put(('locale', name, trans, spans, stats[name], error))
+                    self.progress.emit(70 + 30 * (i + 1) / (len(names) - 1))
+        finally:
+            if locales is not None:
+                locales.close()
+        self.elapsed = time.time() - start
+        self.progress.emit(100)
+
+    def load_trans(self):
+        ''' :return: items, spans and file_stat of the translated file '''
+        stat = file_stat(self.transname)
+        if self.lazy:
+            spans = PropSpans()
+            # a mapped file can not be replaced on Windows when saving
+            return propmap(self.transname, spans, mapped=os.name != 'nt'), spans, stat
+
+        if self.cache is not None:
+            cached = self.cache.load(self.transname, 'trans', self.strings)
+            if cached is not None:
+                self.cached.append(self.transname)
+                trans, spans, self.duplicates['translated'] = cached
+                return trans, spans or PropSpans(), stat
+
+        spans = PropSpans()
+        duplicates = self.duplicates['translated']
+        with open(self.transname, 'rb') as ftrans:
+            st = os.fstat(ftrans.fileno())
+            data = ftrans.read()
+        with timings.span('parse', self.transname):
+            trans = propread(StringIO(data), spans, duplicates, self.strings)
+        if self.cache is not None:
+            self.cache.store(self.transname, trans, spans, 'trans', data, st, duplicates)
+        return trans, spans, stat
+
+    def load_origins(self):
+        if self.lazy:
+            # read, not mapped: build scripts may rewrite it in place, and reading a mapped page
+            # past the new end of the file would kill the process (SIGBUS)
+            self.origins = propmap(self.origname, mapped=False, fix=strip_original)
+            self.results.put(('origins', self.origins, None))
+            return
+
+        if self.cache is not None:
+            cached = self.cache.load(self.origname, 'orig', self.strings)
+            if cached is not None:
+                self.cached.append(self.origname)
+                self.duplicates['original'] = cached[2]
+                self.origins = cached[0]
+                self.results.put(('origins', cached[0], None))
+                return
+
+        with open(self.origname, 'rb') as forig:
+            st = os.fstat(forig.fileno())
+            raw = forig.read()
+        data = raw
+        if '\r' in data:
+            # same as propread
+            data = data.replace('\r\n', '\n').replace('\r', '\n')
+
+        origins = OrderedDict()
+        duplicates = self.duplicates['original']
+        share = 60 if self.project is not None else 90     # of the progress
+        start = time.time()
+        for pos, items, chunk in propparse_chunks(data, self.CHUNK, duplicates, self.strings):
+            if self.cancelled:
+                return
+            for item in items.itervalues():
+                strip_original(item)
+            # repeated in an other chunk
+            duplicates.extend(k for k in items if k in origins)
+            origins.update(items)
+            self.results.put(('origins', items, None))
+            self.progress.emit(10 + share * (pos + chunk.tail()) / len(data))
+        # the chunks are used by the main thread meanwhile
+        timings.add('parse', time.time() - start, self.origname)
+        self.origins = origins
+
+        if self.cache is not None:
+            self.cache.store(self.origname, origins, None, 'orig', raw, st, duplicates)
+
+class SaveWorker(QtCore.QThread):
+    ''' 
+    Serialises and writes the translated file in a background thread, working on a snapshot
+    of the translations taken by ApropyMainWindow.save(). The file is replaced atomically.
+    The sidecar of the originals (see BaseSnapshot) is written in full afterwards if given.
+    Results are left in the attributes, see ApropyMainWindow.on_save_finished.
+    '''
+    progress = QtCore.Signal(int)
+    CHUNK = 5000
+
+    def __init__(self, fname, snapshot, keys, spans=None):
+        '''
+        :param snapshot: list of all the TransItems in file order for a full save, or dict of the
+            changed TransItems by key for an incremental save (then spans must describe the file)
+        :param keys: keys changed since the last checkpoint, to checkpoint after the save
+        '''
+        super(SaveWorker, self).__init__()
+        self.fname = fname
+        self.snapshot = snapshot
+        self.keys = keys
+        self.spans = spans
+        self.full = spans is None
+        self.base = None    # (BaseSnapshot, originals, translated keys) to write the sidecar of
+
+        self.stat = None
+        self.saved = None   # key -> translation written, for the checkpoint
+        self.error = None
+        self.elapsed = 0.0
+
+    def run(self):
+        start = time.time()
+        try:
+            if self.full:
+                self.spans = PropSpans()
+                parts = []
+                pos = 0
+                for i in range(0, len(self.snapshot), self.CHUNK):
+                    part = propserialize(self.snapshot[i:i + self.CHUNK], self.spans, pos)
+                    pos += len(part)
+                    parts.append(part)
+                    self.progress.emit(90 * i / len(self.snapshot))
+                data = ''.join(parts)
+                written = dict((item.key, item.trans) for item in self.snapshot)
+            else:
+                with open(self.fname, 'rb') as fin:
+                    data = proppatch(fin.read(), self.spans, self.snapshot, self.keys)
+                written = dict((key, item.trans) for key, item in self.snapshot.iteritems())
+
+            self.progress.emit(90)
+            atomic_write(self.fname, data)
+            self.stat = file_stat(self.fname)
+            self.saved = dict((key, written.get(key, '')) for key in self.keys)
+        except Exception, e:
+            self.error = e
+        self.elapsed = time.time() - start
+
+        if self.base is not None and self.error is None:
+            with timings.span('base', 'rewritten'):
+                self.base[0].write(*self.base[1:])
+
+class ReparseWorker(QtCore.QThread):
+    '''
+    Parses a file changed on disk in a background thread, for ApropyMainWindow to merge the changes.
+    Results are left in the attributes, see ApropyMainWindow.on_reparse_finished.
+    '''
+    def __init__(self, fname, original=False, project=None):
+        super(ReparseWorker, self).__init__()
+        self.fname = fname
+        self.original = original
+        self.project = project
+
+        self.items = None
+        self.spans = None
+        self.stat = None    # file_stat taken before reading
+        self.duplicates = []    # keys defined more than once in the file
+        self.error = None
+
+    def run(self):
+        try:
+            spans = PropSpans()
+            with open(self.fname, 'rb') as fin:
+                st = os.fstat(fin.fileno())
+                data = fin.read()
+            strings = self.project.strings if self.project is not None else None
+            items = propread(StringIO(data), spans, self.duplicates, strings)
+            if self.original:
+                for item in items.itervalues():
+                    strip_original(item)
+            self.items, self.spans, self.stat = items, spans, (st.st_size, st.st_mtime)
+        except Exception, e:
+            self.error = e
+
+class MemoryWorker(QtCore.QThread):
+    '''
+    Builds the TranslationMemory of the loaded bundle and of the imported ones in a background thread.
+    Imported files which can not be read are left out, their errors are collected.
+    '''
+    def __init__(self, pairs, imports):
+        '''
+        :param pairs: (key, original, translation) of the translated keys of the loaded bundle
+        :param imports: (base file, translated file) of the imported bundles
+        '''
+        super(MemoryWorker, self).__init__()
+        self.pairs = pairs
+        self.imports = imports
+        self.memory = None
+        self.errors = []
+        self.elapsed = 0.0
+
+    def run(self):
+        start = time.time()
+        memory = TranslationMemory()
+        for origname, transname in self.imports:
+            try:
+                memory.add_files(origname, transname)
+            except Exception, e:
+                self.errors.append((transname, e))
+        for key, source, target in self.pairs:
+            memory.add(key, source, target)
+        self.memory = memory
+        self.elapsed = time.time() - start
+
 class ApropyMainWindow(Ui_MainWindow):
     def __init__(self, application, window, config):
         Ui_MainWindow.__init__(self)
@@ -164,10 +905,25 @@ class ApropyMainWindow(Ui_MainWindow):
         
         self.origfname = config.get_origfname()
         self.transfname = config.get_transfname()
+        self.save_worker = None
+        self.load_worker = None
+        self.parse_cache = config.get_parse_cache()
+        self.project = None     # Project of all the locales in project mode
+        self.locale = None      # name of the locale edited in project mode
+        self.orig_stat = None
+        self.memory = None      # TranslationMemory, None while it is built
+        self.memory_worker = None
+        self.memory_pending = {}    # key -> translation entered while the memory is built
+        self.issues_dialog = None
+        self.journal = None     # EditJournal of the translated file
+        self.journal_timer = QtCore.QTimer()
+        self.journal_timer.setSingleShot(True)
+        self.journal_timer.setInterval(JOURNAL_DELAY)
+        self.journal_timer.timeout.connect(self.flush_journal)
 
         self.setup_tableview()
+        self.setup_watcher()
         self.load_dict(self.origfname, self.transfname)
-        self.table_select_item(0, 2) # select first translation
         self.setup_status_bar()
        
         self.create_actions()
@@ -187,11 +943,27 @@ class ApropyMainWindow(Ui_MainWindow):
 
     def setup_tableview(self):
         # filter and model will be created only once
-        self.model = HighlightModel(5, 3)
-        self.filter_proxy_model = QtGui.QSortFilterProxyModel()
+        self.model = HighlightModel()
+        self.model.updater = self.update_translation
+        self.model.history.max_size = self.config.get_undo_memory()
+        self.filter_proxy_model = FilterProxyModel()
         self.filter_proxy_model.setSourceModel(self.model)
-        self.filter_proxy_model.setFilterKeyColumn(3)
-        self.filter_proxy_model.setFilterCaseSensitivity(QtCore.Qt.CaseInsensitive)
+        self.search_index = SearchIndex()
+        self.consistency = ConsistencyIndex()
+        self.lint = LintIndex()
+        self.model.lint = self.lint
+        self.base = BaseSnapshot()
+        self.model.base = self.base
+        self.issues_timer = QtCore.QTimer()
+        self.issues_timer.setSingleShot(True)
+        self.issues_timer.setInterval(FILTER_DELAY)
+        self.issues_timer.timeout.connect(self.update_issues)
+        self.search_workers = set()     # running ones, also the cancelled
+        self.search_generation = 0
+        self.search_timer = QtCore.QTimer()
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(FILTER_DELAY)
+        self.search_timer.timeout.connect(self.start_search)
 
         self.tableEditor = TableDelegate()
         self.tableView.setItemDelegate(self.tableEditor)
@@ -199,26 +971,54 @@ class ApropyMainWindow(Ui_MainWindow):
         self.tableView.setModel(self.filter_proxy_model)
 
         self.tableView.setSelectionMode(self.tableView.SingleSelection)
-        self.hide_last_col()
+        self.setup_columns()
+
+    def setup_watcher(self):
+        self.watcher = QtCore.QFileSystemWatcher()
+        self.watcher.fileChanged.connect(self.on_file_changed)
+        self.watch_timer = QtCore.QTimer()
+        self.watch_timer.setSingleShot(True)
+        self.watch_timer.setInterval(WATCH_DELAY)
+        self.watch_timer.timeout.connect(self.check_files)
+        self.reparse_workers = {}   # 'orig' or 'trans' -> ReparseWorker
 
     def setup_status_bar(self):
         self.window.statusBar().showMessage('Translated:')
 
+        self.unsavedText = QtGui.QLabel('')
         self.progressText = QtGui.QLabel('')
         self.progressBar = QtGui.QProgressBar()
+        self.window.statusBar().addPermanentWidget(self.unsavedText)
         self.window.statusBar().addPermanentWidget(self.progressText)
         self.window.statusBar().addPermanentWidget(self.progressBar)
 
         self.progressBar.setGeometry(30, 40, 200, 25)
 
+        self.timingText = QtGui.QLabel('')
+        self.readout_timer = QtCore.QTimer()
+        self.readout_timer.setInterval(READOUT_INTERVAL)
+        self.readout_timer.timeout.connect(self.update_readout)
+        if self.config.get_show_timings():
+            # spans may be added by workers, the label is updated from here only
+            self.window.statusBar().insertPermanentWidget(0, self.timingText)
+            self.readout_timer.start()
+
         self.update_status_bar()
         
-    def update_status_bar(self):
+    def update_status_bar(self, *args):
         orig_keycnt = len(self.origins)
-        trans_keycnt = len(self.trans)
+        # translations of outdated originals are to be done again
+        outdated = len(self.base.outdated)
+        trans_keycnt = len(self.trans) - outdated
+        unsaved = len(self.model.dirty)
+        self.unsavedText.setText('%d unsaved' % unsaved if unsaved else '')
         if orig_keycnt > 0:
             self.progressBar.setValue(trans_keycnt * 100 / orig_keycnt)
-            self.progressText.setText('%d / %d' % (trans_keycnt, orig_keycnt))
+            self.progressText.setText('%d / %d' % (trans_keycnt, orig_keycnt) +
+                                      (' (%d outdated)' % outdated if outdated else ''))
+
+    def update_readout(self):
+        self.timingText.setText(timings.readout(READOUT_SPANS))
 
     def tableKeyPress(self, event):
         ''' Key bindings are hacked so a TAB press on table does not go to next cell but
@@ -230,6 +1030,10 @@ class ApropyMainWindow(Ui_MainWindow):
         else:
             self.oldTableKeyPress(event)
 
+    def tablePaint(self, event):
+        with timings.span('paint'):
+            self.oldTablePaint(event)
+
     def transEditKeyPress(self, event):
         ''' Bottom edit box should not accept TABs but instead window should switch to
             translation table '''
@@ -240,6 +1044,8 @@ class ApropyMainWindow(Ui_MainWindow):
 
     def create_actions(self):
         self.model.dataChanged.connect(self.on_table_data_changed)
+        self.model.dirty_changed.connect(self.update_status_bar)
+        self.model.dirty_changed.connect(self.update_undo_actions)
         
         self.action_Save.setShortcut('Ctrl+S')
         self.action_Save.setStatusTip('Save translated file')
@@ -247,26 +1053,45 @@ class ApropyMainWindow(Ui_MainWindow):
         self.action_Open.setShortcut('Ctrl+O')
         self.action_Open.setStatusTip('Open translation')
         self.action_Open.triggered.connect(self.on_open)
+        self.action_Undo.setStatusTip('Undo the last edit')
+        self.action_Undo.triggered.connect(self.on_undo)
+        self.action_Redo.setStatusTip('Redo the last edit undone')
+        self.action_Redo.triggered.connect(self.on_redo)
+        self.update_undo_actions()
+        self.action_ImportTM.setStatusTip('Use the translations of an other bundle for suggestions')
+        self.action_ImportTM.triggered.connect(self.on_import_memory)
+        self.action_Inconsistent.setStatusTip('Show the keys with the same original but different translations')
+        self.action_Inconsistent.triggered.connect(self.on_show_inconsistent)
+        self.action_Issues.setStatusTip('List the placeholder, format and duplicate key problems of the translations')
+        self.action_Issues.triggered.connect(self.on_show_issues)
         
         self.action_About.triggered.connect(self.on_about)
         
         findShortcut = QtGui.QShortcut(QtGui.QKeySequence("Ctrl+F"), self.window)
         findShortcut.activated.connect(self.on_find)
 
-        self.filterEdit.textChanged.connect(self.filter_proxy_model.setFilterFixedString)
+        self.filterEdit.textChanged.connect(self.on_filter_edited)
+        self.scopeCombo.currentIndexChanged.connect(self.start_search)
+        self.wordBox.clicked.connect(self.start_search)
+        self.regexBox.clicked.connect(self.start_search)
         self.untransOnlyBox.clicked.connect(self.on_untransbox)
+        self.outdatedOnlyBox.clicked.connect(self.on_untransbox)
+        self.localeCombo.activated.connect(self.on_locale_selected)
         selMode = self.tableView.selectionModel()
         selMode.selectionChanged.connect(self.on_sel_changed)
 
         self.transEdit.textChanged.connect(self.on_bottom_data_changed)
 
         self.copyButton.clicked.connect(self.on_copy_button)
+        self.suggestionList.itemDoubleClicked.connect(self.on_suggestion_used)
        
         # replace tab behaviour
         self.oldTableKeyPress = self.tableView.keyPressEvent
         self.tableView.keyPressEvent = self.tableKeyPress
         self.oldTransEditKeyPress = self.transEdit.keyPressEvent
         self.transEdit.keyPressEvent = self.transEditKeyPress
+        self.oldTablePaint = self.tableView.paintEvent
+        self.tableView.paintEvent = self.tablePaint
         
         self.oldCloseEvent = self.window.closeEvent
         self.window.closeEvent = self.on_close
@@ -282,14 +1107,91 @@ class ApropyMainWindow(Ui_MainWindow):
             VERSION_STR + "\n\nCopyright (C) 2016 Andras Szell\nBug reports to: szell.andris@gmail.com")
     
     def save(self):
+        ''' Start saving the translations in the background, see SaveWorker '''
+        self.wait_for_save()
+        # a partially loaded bundle would be saved without the rest of the keys
+        self.wait_for_load()
+        # changes made on disk by others are merged, not overwritten
+        self.merge_changed_files()
+
+        reordered = False
         if self.config.get_cleanup_keys():
             logger.info("Cleaning up and reordering translation keys before saving")
-            self.cleanup_dict()
-            
-        fout = open(self.transfname, 'wb')
-        count =propsave(fout, self.trans)
-        fout.close()
-        logger.info(self.transfname + ' saved: %d items' % count)
+            reordered = self.cleanup_dict()
+
+        if reordered or not self.trans_spans or file_stat(self.transfname) != self.trans_stat:
+            # full rewrite, positions of the items are collected for later incremental saves
+            worker = SaveWorker(self.transfname, self.trans.values(), self.model.dirty.keys())
+        elif self.model.has_changes():
+            # file is the same as the last time: rewrite only the entries changed since then
+            keys = self.model.dirty.keys()
+            # keys new in the file are appended in the order of the dictionary
+            new = [k for k in keys if k not in self.trans_spans]
+            keys = [k for k in keys if k in self.trans_spans] + keys_in_order(self.trans, new)
+            changed = dict((k, self.trans[k]) for k in keys if k in self.trans)
+            worker = SaveWorker(self.transfname, changed, keys, self.trans_spans.copy())
+        else:
+            logger.info("No changes to save")
+            return
+        if self.base.needs_rewrite():
+            # a pass over all the keys, see BaseSnapshot.write
+            worker.base = (self.base, self.origins, frozenset(dict.keys(self.trans)))
+
+        self.save_worker = worker
+        worker.progress.connect(self.on_save_progress, QtCore.Qt.QueuedConnection)
+        worker.finished.connect(self.on_save_finished, QtCore.Qt.QueuedConnection)
+        self.on_save_progress(0)
+        worker.start()
+
+    def wait_for_save(self):
+        ''' Block until a background save is finished and process its results
+        :return: False if the save failed
+        '''
+        if self.save_worker is None:
+            return True
+        self.save_worker.wait()
+        return self.on_save_finished()
+
+    def on_save_progress(self, percent):
+        self.window.statusBar().showMessage('Saving %s... %d%%' % (self.transfname, percent))
+
+    def on_save_finished(self):
+        worker = self.save_worker
+        if worker is None or worker.isRunning():
+            # queued signal of a save that has been processed already
+            return True
+        self.save_worker = None
+
+        if worker.error is not None:
+            # keys stay dirty, they will be written next time
+            emsg = "Error saving translated file: " + worker.fname + "\n\nPython exception:\n  " + str(worker.error)
+            logger.error(emsg)
+            self.window.statusBar().showMessage('Save failed')
+            error_popup(emsg)
+            return False
+
+        self.trans_spans = worker.spans
+        self.trans_stat = worker.stat
+        timings.add('save', worker.elapsed, 'full' if worker.full else '%d changed items' % len(worker.keys))
+
+        # update highlighting (edited items were green) from what has been written
+        with timings.span('checkpoint'):
+            self.model.create_checkpoint(worker.saved)
+        self.reset_journal()
+        # the translations saved are made from the current originals
+        with timings.span('base'):
+            self.model.keys_changed(self.base.record(worker.saved.keys(), self.origins, self.trans))
+        self.update_status_bar()
+
+        if worker.full:
+            # every key is written once
+            self.set_duplicates('translated', [])
+            msg = 'saved: %d items' % len(worker.snapshot)
+        else:
+            msg = 'saved: %d changed items' % len(worker.keys)
+        logger.info(worker.fname + ' ' + msg)
+        self.window.statusBar().showMessage('Saved ' + worker.fname, 5000)
+        return True
     
     def on_save(self):
         # Terminate ongoing edits of table to get edited data into model (in case CTRL+S pressed)
@@ -298,12 +1200,12 @@ class ApropyMainWindow(Ui_MainWindow):
             self.tableView.setFocus()
         
         self.save()
-        
-        # update highlighting (edited items were green)
-        self.model.create_checkpoint(self.origins, self.trans)
 
     def on_close(self, event):
-        if self.model.has_changes(self.origins, self.trans):
+        self.wait_for_save()
+        self.wait_for_reparse()
+
+        if self.model.has_changes():
             res = QMessageBox.warning(self.window, "Unsaved changes", 
                     "You have unsaved translation strings. Exit without saving?", 
                     QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel, QMessageBox.Cancel)
@@ -311,18 +1213,34 @@ class ApropyMainWindow(Ui_MainWindow):
             if res == QMessageBox.Save:
                 logger.info("Save changes and quit")
                 self.save()
-                self.oldCloseEvent(event)
-                event.accept()            
+                if self.wait_for_save():
+                    self.flush_journal()
+                    self.stop_workers()
+                    self.oldCloseEvent(event)
+                    event.accept()
+                else:
+                    event.ignore()
             elif res == QMessageBox.Discard:
                 logger.info("Discard changes and quit")
+                self.discard_journal()
+                self.stop_workers()
                 self.oldCloseEvent(event)
                 event.accept()            
             else:
                 event.ignore()
         else:
+            self.flush_journal()
+            self.stop_workers()
             self.oldCloseEvent(event)
             event.accept()
         
+    def stop_workers(self):
+        ''' Stop the background threads before quitting '''
+        self.stop_search()
+        self.cancel_load()
+        self.stop_reparse()
+        self.stop_memory()
+
     def ask_for_basedir_change(self):
         msgBox = QMessageBox()
         msgBox.setText("Found a " + ORIG_BASENAME + " file in the translated file's directory.")
@@ -342,7 +1260,8 @@ class ApropyMainWindow(Ui_MainWindow):
         new_origfname = config.get_origfname()
         new_transfname = config.get_transfname()
         
-        if new_origfname != self.origfname or new_transfname != self.transfname:
+        project_mode_changed = config.get_project_mode() != (self.project is not None)
+        if new_origfname != self.origfname or new_transfname != self.transfname or project_mode_changed:
             self.origfname, self.transfname = new_origfname, new_transfname
             self.load_dict(self.origfname, self.transfname)
             self.update_status_bar()
@@ -351,34 +1270,71 @@ class ApropyMainWindow(Ui_MainWindow):
     def on_find(self):
         self.filterEdit.setFocus()
         
-    def on_untransbox(self):
-        if self.untransOnlyBox.isChecked():
-            self.fill_model(include_translated=False)
+    def on_filter_edited(self, text):
+        # wait for the user to stop typing
+        self.search_timer.start()
+
+    def start_search(self, *args):
+        ''' Apply the filter box and search modes, cancelling the query still running '''
+        self.search_timer.stop()
+        self.search_generation += 1
+        for worker in self.search_workers:
+            worker.cancel()
+
+        text = self.filterEdit.text()
+        if not text:
+            self.filter_proxy_model.set_keys(None)
+            return
+
+        try:
+            query = SearchQuery(text, self.regexBox.isChecked(), self.wordBox.isChecked(),
+                                SEARCH_SCOPES[self.scopeCombo.currentIndex()])
+        except re.error, e:
+            # keep the last result until the expression is fixed
+            self.window.statusBar().showMessage("Invalid regular expression: %s" % e, 3000)
+            return
+
+        self.search_index.refresh()
+        worker = SearchWorker(self.search_index, query, self.search_generation)
+        worker.page.connect(self.on_search_page, QtCore.Qt.QueuedConnection)
+        worker.done.connect(self.on_search_done, QtCore.Qt.QueuedConnection)
+        worker.finished.connect(partial(self.on_search_finished, worker), QtCore.Qt.QueuedConnection)
+        self.search_workers.add(worker)
+        worker.start()
+
+    def stop_search(self):
+        ''' Cancel the queries and wait for their threads to end '''
+        self.search_timer.stop()
+        self.search_generation += 1
+        for worker in list(self.search_workers):
+            worker.cancel()
+            worker.wait()
+
+    def on_search_page(self, generation, keys):
+        if generation == self.search_generation:
+            self.filter_proxy_model.set_keys(keys)
+
+    def on_search_done(self, generation, keys):
+        if generation == self.search_generation:
+            self.filter_proxy_model.set_keys(keys)
+
+    def on_search_finished(self, worker):
+        self.search_workers.discard(worker)
+        if worker.cancelled:
+            logger.debug("Filter '%s' cancelled" % worker.query.text)
         else:
-            self.fill_model(include_translated=True)
-            
-    def update_hidden_col(self, row):
-        ''' Updates the hidden fourth column used for filtering (first three cols concatenated with spaces)
-        :param topleft: model index for the row whose hidden column is to be updated
-        '''
-        item_key = self.model.item(row, 0)
-        item_orig = self.model.item(row, 1)
-        item_trans = self.model.item(row, 2)
-        itext = ' '.join([item_key.text(), item_orig.text(), item_trans.text()])
-        item_all = QtGui.QStandardItem(itext)
-        signalsBlocked = self.model.signalsBlocked()
-        self.model.blockSignals(True)
-        self.model.setItem(row, 3, item_all)
-        self.model.blockSignals(signalsBlocked)
+            logger.debug("Filter '%s': %d matches in %.3f s" % (worker.query.text, worker.matches, worker.elapsed))
+            timings.add('filter', worker.elapsed)
 
+    def on_untransbox(self):
+        self.fill_model(include_translated=not self.untransOnlyBox.isChecked(),
+                        outdated_only=self.outdatedOnlyBox.isChecked())
+            
     def on_table_data_changed(self, topleft, bottomright):
-        self.edited_key = self.model.item(topleft.row(), 0).text()
-        translation = self.model.item(topleft.row(), 2).text()
-        self.update_translation(self.edited_key, translation)
-        self.update_hidden_col(topleft.row())
-
-        # refresh the other view of the same data
-        if not self.tablerefresh_from_bottom:
+        # translation has been updated by the model already, 
+        # refresh the other view of the same data if it shows a changed row
+        edited = self.edited_row is not None and topleft.row() <= self.edited_row <= bottomright.row()
+        if edited and not self.tablerefresh_from_bottom:
             self.transEdit.blockSignals(True)
             self.update_bottom()
             self.transEdit.blockSignals(False)
@@ -402,8 +1358,22 @@ class ApropyMainWindow(Ui_MainWindow):
                     action_paste.setEnabled(False)
                 self.contextmenu.addAction(action_paste)
                 
+            same = self.consistency.group(self.model.key(selected.row()))
+            if selected.column() == 2 and len(same) > 1:
+                action_apply = QtGui.QAction('&Apply this translation to all %d identical originals' % len(same),
+                                             self.window)
+                action_apply.triggered.connect(self.on_apply_to_identical)
+                if self.model.is_empty(selected):
+                    action_apply.setEnabled(False)
+                self.contextmenu.addAction(action_apply)
+
             self.contextmenu.addSeparator()
             
+            if self.model.key(selected.row()) in self.base.outdated:
+                action_reviewed = QtGui.QAction('Translation matches the &new original', self.window)
+                action_reviewed.triggered.connect(self.on_mark_reviewed)
+                self.contextmenu.addAction(action_reviewed)
+
             action_revert = QtGui.QAction('&Revert/Undo', self.window)
             action_revert.triggered.connect(self.on_undo_context)
             if not self.model.is_changed_idx(selected):
@@ -416,30 +1386,126 @@ class ApropyMainWindow(Ui_MainWindow):
         selected = self.get_selected_index()
         if selected is not None and self.model.is_changed_idx(selected):
             self.model.revert_translation(selected)
-        logger.info("Reverted key '%s'" % self.model.item(selected.row(), 0).text())
+        logger.info("Reverted key '%s'" % self.model.key(selected.row()))
         
+    def on_mark_reviewed(self):
+        ''' The translation of the selected key is right for the changed original as it is '''
+        selected = self.get_selected_index()
+        if selected is None:
+            return
+        key = self.model.key(selected.row())
+        self.model.keys_changed(self.base.record([key], self.origins, self.trans))
+        self.update_bottom()
+        self.update_status_bar()
+        logger.info("Translation of '%s' reviewed against the changed original" % key)
+
+    def on_undo(self):
+        self.apply_history(self.model.undo)
+
+    def on_redo(self):
+        self.apply_history(self.model.redo)
+
+    def apply_history(self, function):
+        if self.tableEditor.isEdited():
+            self.tableEditor.stopEditing()
+            self.tableView.setFocus()
+        keys = function()
+        if keys:
+            # the bottom editor is refreshed by on_table_data_changed if it shows one of them
+            if self.edited_key not in keys:
+                self.select_key(keys[0])
+            logger.info("%s of %d keys" % ('Undo' if function == self.model.undo else 'Redo', len(keys)))
+
+    def update_undo_actions(self, *args):
+        self.action_Undo.setEnabled(self.model.history.can_undo())
+        self.action_Redo.setEnabled(self.model.history.can_redo())
+
     def on_copy_context(self):
         selected = self.get_selected_index()
         if selected is not None:
             #print self.clipboard.text()
-            self.clipboard.setText(self.model.itemFromIndex(selected).text())
+            self.clipboard.setText(self.model.text(selected.row(), selected.column()))
+
+    def on_apply_to_identical(self):
+        selected = self.get_selected_index()
+        if selected is None:
+            return
+        key = self.model.key(selected.row())
+        text = self.model.translation(selected.row())
+        keys = [k for k in self.consistency.group(key) if self.model.key_translation(k) != text]
+        # one update of the model for all of them
+        self.model.set_translations(keys, text)
+        logger.info("Applied the translation of '%s' to %d keys" % (key, len(keys)))
+        self.window.statusBar().showMessage('Translation applied to %d more keys' % len(keys), 5000)
+
+    def on_show_inconsistent(self):
+        ''' Show the keys of the originals translated in more than one way '''
+        self.wait_for_load()
+        self.search_timer.stop()
+        self.filterEdit.blockSignals(True)
+        self.filterEdit.setText('')
+        self.filterEdit.blockSignals(False)
+        keys = self.consistency.inconsistent_keys()
+        self.filter_proxy_model.set_keys(keys)
+        self.window.statusBar().showMessage('%d originals translated inconsistently, %d keys'
+                                            % (len(self.consistency.inconsistent), len(keys)), 5000)
+
+    def on_show_issues(self):
+        if self.issues_dialog is None:
+            self.issues_dialog = MyIssuesDialog(QDialog(self.window), self.lint, self.on_issue_selected)
+        self.issues_dialog.refresh()
+        self.issues_dialog.window.show()
+        self.issues_dialog.window.raise_()
+        self.issues_dialog.window.activateWindow()
+
+    def on_issue_selected(self, key):
+        row = self.model.rows.get(key)
+        if row is not None and not self.filter_proxy_model.mapFromSource(self.model.index(row, 0)).isValid():
+            # hidden by the filter
+            self.filterEdit.setText('')
+            self.search_timer.stop()
+            self.start_search()
+        self.select_key(key)
+        self.tableView.setFocus()
+
+    def issues_changed(self):
+        ''' The issues found changed, the list is refreshed after a while (edits come in quick succession) '''
+        if self.issues_dialog is not None and self.issues_dialog.window.isVisible():
+            self.issues_timer.start()
+
+    def update_issues(self):
+        if self.issues_dialog is not None and self.issues_dialog.window.isVisible():
+            self.issues_dialog.refresh()
+
+    def set_duplicates(self, kind, keys):
+        ''' Keys repeated in the original or translated file changed, see LintIndex.set_duplicates '''
+        if kind == 'translated' and self.project is not None:
+            self.project.duplicates[self.locale] = keys
+        changed = self.lint.set_duplicates(kind, keys)
+        if changed:
+            self.model.keys_changed(changed)
+            self.issues_changed()
 
     def on_paste_context(self):
         selected = self.get_selected_index()
         if selected is not None:
-            self.model.item(selected.row(), 2).setText(self.clipboard.text())
+            self.model.set_translation(selected.row(), self.clipboard.text())
             
     def cleanup_dict(self):
-        # reorder translated strings to match original translation,
-        # delete obsolete keys
-        newOrder = OrderedDict()
-        for k in self.origins.keys():
-            if k in self.trans:
-                newOrder[k] = self.trans[k]
-
-        self.trans = newOrder
+        ''' Reorder translated strings to match original translation, delete obsolete keys.
+        :return: True if the order of the translations changed
+        '''
+        # the orders are compared first, reordering decodes every item of a lazily loaded file
+        order = [k for k in self.origins if k in self.trans]
+        changed = order != self.trans.keys()
+        if changed:
+            newOrder = propreorder(self.trans, order)
+            # in place, the model refers to the same dictionary
+            self.trans.clear()
+            self.trans.update(newOrder)
         
         self.update_status_bar()
+        return changed
 
     def update_translation(self, key, translation):
         if key in self.trans:
@@ -447,7 +1513,8 @@ class ApropyMainWindow(Ui_MainWindow):
                 # empty string entered -> delete translation entry
                 self.trans.pop(key)
             else:
-                self.trans[key].trans = translation                
+                # items are replaced, not modified, so a save in progress keeps its snapshot
+                self.trans[key] = TransItem(key, self.trans[key].comment, translation)
         elif translation.strip():
             if config.get_copy_comments():
                 newkey = TransItem(key, self.origins[key].comment, translation)
@@ -455,30 +1522,41 @@ class ApropyMainWindow(Ui_MainWindow):
                 newkey = TransItem(key, '', translation)
             self.trans[key] = newkey
 
+        self.search_index.update(key)
+        self.consistency.update(key)
+        if self.lint.update(key):
+            self.issues_changed()
+        self.base.update(key, self.origins, self.trans)
+        if self.journal is not None:
+            self.journal.append(key, translation)
+            if not self.journal_timer.isActive():
+                self.journal_timer.start()
+        self.update_memory(key, translation)
         self.update_status_bar()
         
-    def row_updated(self, row):
-        self.model.item(self.edited_row, 0).emitDataChanged()
-        self.model.item(self.edited_row, 1).emitDataChanged()
-            
     def table_delete_translation(self):
         if self.edited_row is not None:
-            self.model.item(self.edited_row, 2).setText('')
-        self.row_updated(self.edited_row)        
+            self.model.set_translation(self.edited_row, '')
         
     def table_select_item(self, row, col):
-        target = self.model.index(row, col)
+        target = self.filter_proxy_model.mapFromSource(self.model.index(row, col))
         self.tableView.selectionModel().setCurrentIndex(target, QtGui.QItemSelectionModel.ClearAndSelect)
         self.on_sel_changed(QtGui.QItemSelection(target, target), QtGui.QItemSelection)
 
     def on_bottom_data_changed(self):
         self.tablerefresh_from_bottom = True
         if self.edited_row is not None:
-            self.model.item(self.edited_row, 2).setText(self.transEdit.toPlainText())
+            self.model.set_translation(self.edited_row, self.transEdit.toPlainText(), merge=True)
 
         self.tablerefresh_from_bottom = False
 
     def update_bottom(self):
+        # the original the translation was made from, next to the current one
+        old = self.base.old.get(self.edited_key) if self.edited_key in self.base.outdated else None
+        self.oldOrigEdit.setVisible(old is not None)
+        self.oldOrigEdit.setPlainText(old or '')
+        self.label_3.setText('Original (changed since translated, old | new):' if old is not None else 'Original:')
+
         # if nothing is selected
         if self.edited_key is None:
             self.origEdit.setPlainText('')
@@ -517,6 +1595,7 @@ class ApropyMainWindow(Ui_MainWindow):
             return None
 
     def on_sel_changed(self, selected, deselected):
+        self.model.history.end_step()
         # earlier it was possible to select multiple items, kept handling that case
         if selected.indexes():
             modelindex = selected.indexes()[0]
@@ -530,103 +1609,694 @@ class ApropyMainWindow(Ui_MainWindow):
             self.edited_row = None
             self.update_bottom()
             # print "selected: nothing"
+        self.update_suggestions()
 
-    def fill_model(self, include_translated=True, **kwargs):
-        old_rowcnt = self.model.rowCount()
-
-        # beginResetModel - endResetModel is required to get the number of displayed table
-        # rows be properly updated
-        self.model.beginResetModel()
-        self.model.blockSignals(True)
-        self.model.clear()
-        
-        row = 0
-        
-        for tr in self.origins.values():
-            if DEBUG_ROWLIMIT is not None and row >= DEBUG_ROWLIMIT:
-                break
-        
-            # skip lines with existing translation if 'untranslated only' selected
-            if tr.key in self.trans and not include_translated:
-                continue
-
-            item_key = QtGui.QStandardItem(tr.key)
-            item_key.setFlags(item_key.flags() & ~QtCore.Qt.ItemIsEditable)
-            item_orig = QtGui.QStandardItem(tr.trans)
-            item_orig.setFlags(item_orig.flags() & ~QtCore.Qt.ItemIsEditable)
-
-            if tr.key in self.trans:
-                item_trans = QtGui.QStandardItem(self.trans[tr.key].trans)
-            else:
-                item_trans = QtGui.QStandardItem('')
-
-            item_all = QtGui.QStandardItem(' '.join([item_key.text(), item_orig.text(), item_trans.text()]))
+    def fill_model(self, include_translated=True, outdated_only=False, **kwargs):
+        # skip lines with existing translation if 'untranslated only' selected, the ones translated
+        # from the current original if 'outdated only' (both: the ones to be translated)
+        if include_translated and not outdated_only:
+            keys = self.origins.keys()
+        else:
+            outdated = self.base.outdated if outdated_only else ()
+            keys = [k for k in self.origins if k in outdated or not include_translated and k not in self.trans]
 
-            self.model.setItem(row, 0, item_key)
-            self.model.setItem(row, 1, item_orig)
-            self.model.setItem(row, 2, item_trans)
-            self.model.setItem(row, 3, item_all)
-            row += 1
+        if DEBUG_ROWLIMIT is not None:
+            keys = keys[:DEBUG_ROWLIMIT]
 
-        # without blocking the signals we'd receive lots of errors 
-        # as the translation updates would be triggered on data change        
-        self.model.blockSignals(False)
-        
-        # endResetModel must be able to emit signals so filter gets updated
-        self.model.setHorizontalHeaderLabels(['Key', 'Original', 'Translation'])
-        self.model.endResetModel()
+        # the model only refers to the dictionaries, reset makes the table and filter reread them
+        with timings.span('fill_model', '%d rows' % len(keys)):
+            self.model.set_rows(self.origins, self.trans, keys)
+        self.start_search()
         
-        self.hide_last_col()
+        self.setup_columns()
         self.tableView.scrollToTop()
 
         self.edited_key = None
         self.edited_row = None
         self.update_bottom()
 
-    def hide_last_col(self):
-        # fixme: when model is reset, table view somehow forgets its hidden cols
-        # so as a workaround it is repeatedly hidden
-        self.tableView.setColumnHidden(3, True)
-       
+    def setup_columns(self):
         header = self.tableView.horizontalHeader()
         header.setResizeMode(0, QtGui.QHeaderView.ResizeToContents)
         header.setResizeMode(1, QtGui.QHeaderView.Stretch)
         header.setResizeMode(2, QtGui.QHeaderView.Stretch)
+        for col in range(3, self.model.columnCount()):
+            header.setResizeMode(col, QtGui.QHeaderView.Stretch)
             
     def load_dict(self, origname, transname):
+        ''' Start loading the files in the background, see LoadWorker. Rows are added to the table
+            as the original file is parsed. '''
+        self.cancel_load()
+        self.wait_for_save()
+        self.stop_reparse()
+        self.stop_memory()
+        self.memory = None
+        # edits not saved stay in the journal of the previous file, offered when it is opened again
+        self.flush_journal()
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = None
+
         # empty dict in case file read fails
         self.origins = OrderedDict() 
         self.trans = OrderedDict()
+        # positions of the items in the translated file, for incremental saves
+        self.trans_spans = PropSpans()
+        self.trans_stat = None
+
+        self.search_index.build(self.origins, self.trans)
+        self.consistency.build(self.origins, self.trans)
+        self.lint.build(self.origins, self.trans)
+        self.issues_changed()
+        self.base.load(None)
+        self.fill_model()
+        self.model.create_checkpoint({}, reset=True)
+
+        self.project = None
+        self.locale = None
+        if self.config.get_project_mode() and origname != '':
+            self.project = Project(origname)
+            if transname == '' and self.project.locales:
+                transname = self.transfname = self.project.locales.values()[0]
+            if transname != '':
+                self.locale = self.project.locale_of(transname)
+                if self.locale is None:
+                    # not next to the base file, edited along with the ones there
+                    self.locale = os.path.basename(transname)
+                    self.project.locales[self.locale] = transname
+            else:
+                self.project = None
+        self.setup_locales()
+
+        # taken before reading, so changes made while loading are noticed
+        self.orig_stat = file_stat(origname)
+        if self.watcher.files():
+            self.watcher.removePaths(self.watcher.files())
+        self.watch_files()
 
         if origname != '' and transname != '':
-        
-            try:
-                forig = open(origname, 'rU')
-                self.origins = propread(forig)
-                forig.close()
-                # remove leading spaces in original translation coming from 'key = translation' strings
-                for k in self.origins.keys():
-                    self.origins[k].trans = self.origins[k].trans.lstrip(' ')
-                
-            except Exception, e:
-                emsg = "Error opening original file: " + origname + "\n" + str(e)
-                logger.error(emsg)
-                error_popup(emsg)
-                
+            self.journal = EditJournal(transname)
+            worker = LoadWorker(origname, transname, self.config.get_lazy_load(), self.parse_cache,
+                                self.project, self.locale)
+            self.load_worker = worker
+            worker.progress.connect(self.on_load_progress, QtCore.Qt.QueuedConnection)
+            worker.finished.connect(self.on_load_finished, QtCore.Qt.QueuedConnection)
+            self.on_load_progress(0)
+            worker.start()
+
+    def cancel_load(self):
+        ''' Stop a load in progress, keeping what has been loaded so far '''
+        worker = self.load_worker
+        if worker is not None:
+            self.load_worker = None
+            worker.cancel()
+            worker.wait()
+            logger.info("Loading %s cancelled" % worker.origname)
+
+    def wait_for_load(self):
+        ''' Block until the whole bundle is loaded '''
+        worker = self.load_worker
+        if worker is not None:
+            worker.wait()
+            self.on_load_finished()
+
+    def on_load_progress(self, percent=None):
+        worker = self.load_worker
+        if worker is None:
+            # queued signal of a cancelled or finished load
+            return
+        while True:
             try:
-                ftrans = open(transname, 'rU')
-                self.trans = propread(ftrans)
-                ftrans.close()
-            except Exception, e:
-                emsg = "Error opening translated file: " + transname + "\n\nPython exception:\n  " + str(e)
-                logger.error(emsg)
-                error_popup(emsg)
+                result = worker.results.get_nowait()
+            except Queue.Empty:
+                break
+            if result[0] == 'trans':
+                self.add_translations(*result[1:])
+            elif result[0] == 'locale':
+                self.add_locale(*result[1:])
+            elif result[0] == 'base':
+                self.set_base(result[1])
+            else:
+                self.add_originals(*result[1:])
+        if percent is not None:
+            self.window.statusBar().showMessage('Loading %s... %d%%' % (worker.origname, percent))
 
-        # test: use only 10 lines
-        #self.origins = OrderedDict(self.origins.items()[:10])
-            
+    def on_load_finished(self):
+        worker = self.load_worker
+        if worker is None or worker.isRunning():
+            return
+        self.on_load_progress()
+        self.load_worker = None
+        timings.add('load', worker.elapsed)
+        logger.info("Loaded %d original and %d translated items in %.3f s (%s)" %
+                    (len(self.origins), len(self.trans), worker.elapsed,
+                     'cached: ' + ', '.join(worker.cached) if worker.cached else 'parsed'))
+        if self.project is not None:
+            logger.info("Loaded %d of %d locales" % (len(self.project.trans), len(self.project.locales)))
+        self.check_translations(worker.duplicates)
+        if self.lint.checked is None:
+            self.model.keys_changed(self.lint.issues.keys())
+            logger.info("Found %d keys with translation issues" % len(self.lint.issues))
+        self.replay_journal()
+        self.build_memory()
+        self.window.statusBar().showMessage('Loaded ' + worker.origname, 5000)
+
+    def check_translations(self, duplicates):
+        ''' Find the inconsistent translations and the issues of all the keys. Lazily loaded files
+            are not decoded for it, the keys are checked as their rows are shown and all of them
+            only when listed (see LintIndex.reset) '''
+        if isinstance(self.origins, LazyPropDict):
+            self.consistency.reset(self.origins, self.trans)
+            self.lint.reset(self.origins, self.trans, duplicates)
+        else:
+            self.consistency.build(self.origins, self.trans)
+            self.lint.build(self.origins, self.trans, duplicates)
+        self.issues_changed()
+
+    def set_base(self, base):
+        ''' Take the outdated translations found by the load worker '''
+        # edited while loading
+        for key in self.model.dirty:
+            base.update(key, self.origins, self.trans)
+        changed = base.outdated.symmetric_difference(self.base.outdated)
+        self.base = self.model.base = base
+        if changed:
+            logger.info("Found %d translations of changed originals" % len(base.outdated))
+            if self.outdatedOnlyBox.isChecked():
+                self.on_untransbox()
+            else:
+                self.model.keys_changed(changed)
+            self.update_status_bar()
+
+    def add_translations(self, trans, spans, stat, error):
+        if error is not None:
+            emsg = "Error opening translated file: " + self.load_worker.transname + "\n\nPython exception:\n  " + str(error)
+            logger.error(emsg)
+            error_popup(emsg)
+            return
+        # comes before the originals, the table is empty yet
+        self.trans = trans
+        self.trans_spans = spans
+        self.trans_stat = stat
+        if self.project is not None:
+            self.store_locale()
+        self.search_index.build(self.origins, self.trans)
         self.fill_model()
-        self.model.create_checkpoint(self.origins, self.trans)
+
+    def add_locale(self, name, trans, spans, stat, error):
+        ''' An other locale of the project has been parsed '''
+        if error is not None:
+            # not worth a popup for each of many locales, the others can still be edited
+            logger.error("Error opening translated file: %s\n%s" % (self.project.locales[name], error))
+            self.window.statusBar().showMessage("Unable to load locale " + name, 5000)
+            return
+        self.project.trans[name] = trans
+        self.project.spans[name] = spans
+        self.project.stats[name] = stat
+        if name in self.checked_locale_columns():
+            self.update_locale_columns()
+
+    def setup_locales(self):
+        ''' Fill the locale switcher and the column menu from the project, hidden without one '''
+        project = self.project
+        for widget in (self.localeLabel, self.localeCombo, self.columnsButton):
+            widget.setVisible(project is not None)
+
+        self.localeCombo.clear()
+        menu = self.columnsButton.menu()
+        if menu is None:
+            menu = QtGui.QMenu(self.window)
+            menu.triggered.connect(self.update_locale_columns)
+            self.columnsButton.setMenu(menu)
+        menu.clear()
+        if project is not None:
+            for name in project.locales:
+                self.localeCombo.addItem(name)
+                action = menu.addAction(name)
+                action.setCheckable(True)
+            self.localeCombo.setCurrentIndex(project.locales.keys().index(self.locale))
+        self.model.set_columns([])
+
+    def checked_locale_columns(self):
+        return [action.text() for action in self.columnsButton.menu().actions() if action.isChecked()]
+
+    def update_locale_columns(self, *args):
+        ''' Show the locales checked in the column menu which are loaded already '''
+        key = self.edited_key
+        self.model.set_columns([(name, self.project.trans[name]) for name in self.checked_locale_columns()
+                                if name in self.project.trans])
+        self.setup_columns()
+        self.select_key(key)
+
+    def store_locale(self):
+        ''' Keep the state of the edited locale in the project '''
+        self.project.trans[self.locale] = self.trans
+        self.project.spans[self.locale] = self.trans_spans
+        self.project.stats[self.locale] = self.trans_stat
+
+    def on_locale_selected(self, index):
+        if not self.switch_locale(self.localeCombo.itemText(index)):
+            self.localeCombo.setCurrentIndex(self.project.locales.keys().index(self.locale))
+
+    def switch_locale(self, name):
+        ''' Edit an other locale of the project, the files are not read again
+        :return: False if the switch was cancelled or the locale could not be loaded
+        '''
+        if name == self.locale:
+            return True
+        if self.tableEditor.isEdited():
+            self.tableEditor.stopEditing()
+            self.tableView.setFocus()
+        self.wait_for_save()
+        self.wait_for_reparse()
+
+        if self.model.has_changes():
+            res = QMessageBox.warning(self.window, "Unsaved changes",
+                    "You have unsaved translation strings in %s. Save them before switching?" % self.locale,
+                    QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel, QMessageBox.Cancel)
+            if res == QMessageBox.Save:
+                self.save()
+                if not self.wait_for_save():
+                    return False
+            elif res == QMessageBox.Discard:
+                logger.info("Discard changes of locale " + self.locale)
+                for key, text in self.model.dirty.items():
+                    self.update_translation(key, text)
+                self.discard_journal()
+            else:
+                return False
+
+        if name not in self.project.trans:
+            # still being parsed
+            self.wait_for_load()
+            if name not in self.project.trans:
+                return False
+
+        self.store_locale()
+        self.watcher.removePath(self.transfname)
+        self.flush_journal()
+        self.journal.close()
+        self.locale = name
+        self.transfname = self.project.locales[name]
+        self.journal = EditJournal(self.transfname)
+        self.trans = self.project.trans[name]
+        self.trans_spans = self.project.spans[name]
+        self.trans_stat = self.project.stats[name]
+        # opened next time
+        self.config.set('files', 'trans', self.transfname)
+        self.config.save()
+
+        key = self.edited_key
+        self.search_index.build(self.origins, self.trans)
+        # suggestions in the language of the locale
+        self.build_memory()
+        self.consistency.build(self.origins, self.trans)
+        self.lint.build(self.origins, self.trans, {'original': self.lint.duplicates.get('original', []),
+                                                   'translated': self.project.duplicates.get(name, [])})
+        self.issues_changed()
+        self.base = self.model.base = load_base(self.transfname, self.origins, self.trans)
+        self.on_untransbox()
+        self.model.create_checkpoint({}, reset=True)
+        self.replay_journal()
+        self.update_status_bar()
+        self.select_key(key)
+        logger.info("Editing locale %s: %s" % (name, self.transfname))
+        # the file may have changed since it was parsed
+        self.watch_files()
+        self.check_files()
+        return True
+
+    def select_key(self, key):
+        if key is not None and key in self.model.rows:
+            self.table_select_item(self.model.rows[key], 2)
+
+    def flush_journal(self):
+        self.journal_timer.stop()
+        if self.journal is not None:
+            self.journal.flush()
+
+    def reset_journal(self):
+        ''' Journal only the edits still unsaved '''
+        self.journal_timer.stop()
+        if self.journal is not None:
+            self.journal.reset([(key, self.model.key_translation(key)) for key in self.model.dirty])
+
+    def discard_journal(self):
+        self.journal_timer.stop()
+        if self.journal is not None:
+            self.journal.reset()
+
+    def replay_journal(self):
+        ''' Offer the edits found in the journal of the translated file, left by a session which
+            ended without saving them, e.g. by a crash '''
+        found = self.journal.read() if self.journal is not None else None
+        if found is None:
+            return
+        created, records = found
+        # last translation of each key, only the keys which are still there
+        texts = OrderedDict()
+        for key, text in records:
+            if key in self.origins:
+                texts[key] = text
+        changed = [(key, text) for key, text in texts.iteritems() if self.model.key_translation(key) != text]
+        if changed:
+            res = QMessageBox.question(self.window, "Recover unsaved edits",
+                    "%d translations of %s edited on %s have not been saved. Recover them?" %
+                    (len(changed), self.transfname, time.strftime('%Y-%m-%d %H:%M', time.localtime(created))),
+                    QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+            if res == QMessageBox.Yes:
+                # unsaved (green) again, one undo step
+                self.model.apply_texts(changed, record=True)
+                logger.info("Recovered %d edits from %s" % (len(changed), self.journal.fname))
+        self.reset_journal()
+
+    def build_memory(self):
+        ''' Start building the translation memory in the background, see MemoryWorker.
+            It keeps every text, so for lazily loaded files only if memories were imported. '''
+        self.stop_memory()
+        self.memory = None
+        if isinstance(self.origins, LazyPropDict) and not self.config.get_memory_imports():
+            logger.info("Translation memory not built for the lazily loaded files, import one to use it")
+            return
+        originals = dict((key, item.trans) for key, item in self.origins.iteritems())
+        pairs = [(key, originals[key], item.trans) for key, item in self.trans.iteritems()
+                 if key in originals and item.trans.strip()]
+        imports = []
+        for transname in self.config.get_memory_imports():
+            origname = find_base(transname)
+            if origname is None:
+                logger.error("No base file found for translation memory " + transname)
+            else:
+                imports.append((origname, transname))
+
+        worker = MemoryWorker(pairs, imports)
+        self.memory_worker = worker
+        self.memory_pending = {}
+        # the main window is not a QObject, no sender() to tell the workers apart
+        worker.finished.connect(partial(self.on_memory_finished, worker), QtCore.Qt.QueuedConnection)
+        worker.start()
+
+    def stop_memory(self):
+        ''' Wait for the memory being built and drop it '''
+        if self.memory_worker is not None:
+            self.memory_worker.wait()
+            self.memory_worker = None
+
+    def on_memory_finished(self, worker):
+        if worker is not self.memory_worker or worker.isRunning():
+            # signal of a dropped one
+            return
+        self.memory_worker = None
+        self.memory = worker.memory
+        for key, translation in self.memory_pending.iteritems():
+            self.update_memory(key, translation)
+        self.memory_pending = {}
+
+        for transname, error in worker.errors:
+            logger.error("Error reading translation memory %s: %s" % (transname, error))
+        logger.info("Translation memory of %d segments built in %.3f s" % (len(self.memory), worker.elapsed))
+        self.update_suggestions()
+
+    def update_memory(self, key, translation):
+        if self.memory_worker is not None:
+            self.memory_pending[key] = translation
+        elif self.memory is not None and key in self.origins:
+            self.memory.add(key, self.origins[key].trans, translation if translation.strip() else u'')
+
+    def update_suggestions(self):
+        ''' Show the translations of the originals most similar to the selected one '''
+        self.suggestionList.clear()
+        if self.memory is None or self.edited_key is None:
+            return
+        for match in self.memory.search(self.origins[self.edited_key].trans, SUGGESTIONS, exclude=self.edited_key):
+            item = QtGui.QListWidgetItem(u'%d%%  %s' % (round(match.score * 100), match.target))
+            item.setToolTip(u'%s\n%s' % (match.ref, match.source))
+            item.setData(QtCore.Qt.UserRole, match.target)
+            self.suggestionList.addItem(item)
+
+    def on_suggestion_used(self, item):
+        if self.edited_row is not None:
+            # goes to the model like typing
+            self.transEdit.setPlainText(item.data(QtCore.Qt.UserRole))
+
+    def on_import_memory(self):
+        fullpath, filtermask = QFileDialog(self.window).getOpenFileName(self.window,
+                                    caption="Select a translated file to learn from", dir=workdir, filter="*.properties")
+        if not fullpath:
+            return
+        if find_base(fullpath) is None:
+            error_popup("No base file found for " + fullpath)
+            return
+        self.config.add_memory_import(fullpath)
+        self.config.save()
+        logger.info("Imported translation memory " + fullpath)
+        self.build_memory()
+
+    def watch_files(self):
+        ''' Watch the edited files, a file replaced (also by saving) has to be added again '''
+        watched = self.watcher.files()
+        for fname in (self.origfname, self.transfname):
+            if fname and fname not in watched and os.path.isfile(fname):
+                self.watcher.addPath(fname)
+
+    def on_file_changed(self, path):
+        # a file may be written in several steps
+        self.watch_timer.start()
+
+    def check_files(self):
+        ''' Start reading the files changed on disk since they were read or saved '''
+        self.watch_files()
+        if self.load_worker is not None or self.reparse_workers:
+            # look again when they are done
+            self.watch_timer.start()
+            return
+        self.wait_for_save()
+
+        for kind, fname, stat in (('orig', self.origfname, self.orig_stat), ('trans', self.transfname, self.trans_stat)):
+            current = file_stat(fname)
+            if current is None and stat is not None:
+                # being replaced, wait for the new file
+                self.watch_timer.start()
+            elif current != stat and stat is not None:
+                self.start_reparse(kind, fname)
+
+    def start_reparse(self, kind, fname):
+        worker = ReparseWorker(fname, kind == 'orig', self.project)
+        self.reparse_workers[kind] = worker
+        worker.finished.connect(self.on_reparse_finished, QtCore.Qt.QueuedConnection)
+        self.window.statusBar().showMessage('Reading %s changed on disk...' % fname)
+        worker.start()
+
+    def wait_for_reparse(self):
+        ''' Block until the files being read are merged '''
+        for worker in self.reparse_workers.values():
+            worker.wait()
+        self.on_reparse_finished()
+
+    def stop_reparse(self):
+        ''' Wait for the files being read, without merging them '''
+        for worker in self.reparse_workers.values():
+            worker.wait()
+        self.reparse_workers = {}
+
+    def merge_changed_files(self):
+        ''' Merge the changes of the translated file on disk right now, e.g. before overwriting it '''
+        self.wait_for_reparse()
+        current = file_stat(self.transfname)
+        if current is not None and self.trans_stat is not None and current != self.trans_stat:
+            self.start_reparse('trans', self.transfname)
+            self.wait_for_reparse()
+
+    def on_reparse_finished(self):
+        for kind, worker in self.reparse_workers.items():
+            if worker.isRunning():
+                continue
+            del self.reparse_workers[kind]
+            if worker.error is not None:
+                emsg = "Error reading %s changed on disk: %s" % (worker.fname, worker.error)
+                logger.error(emsg)
+                self.window.statusBar().showMessage(emsg, 5000)
+            elif kind == 'orig':
+                self.merge_originals(worker.items, worker.stat, worker.duplicates)
+            else:
+                self.merge_translations(worker.items, worker.spans, worker.stat)
+                self.set_duplicates('translated', worker.duplicates)
+
+    def merge_originals(self, items, stat, duplicates):
+        ''' Apply the changes of the original file on disk to the rows they concern '''
+        old = dict(self.origins.iteritems())
+        removed = [k for k in old if k not in items]
+        changed = OrderedDict((k, item) for k, item in items.iteritems() if old.get(k) != item)
+        self.orig_stat = stat
+        if not removed and not changed:
+            self.set_duplicates('original', duplicates)
+            return
+
+        for key in removed:
+            del self.origins[key]
+        self.model.remove_rows(removed)
+        # edits of the keys removed can not be undone
+        self.model.history.forget(removed)
+        self.update_undo_actions()
+
+        new = [k for k in changed if k not in self.origins]
+        for key, item in changed.iteritems():
+            self.origins[key] = item
+            self.search_index.update(key)
+            if key in self.model.rows:
+                self.model.row_changed(self.model.rows[key])
+        if new or self.origins.keys() != items.keys():
+            # at their place in the file, like after opening it again
+            reorder_keys(self.origins, items.keys())
+            untrans_only = self.untransOnlyBox.isChecked()
+            show_all = not untrans_only and not self.outdatedOnlyBox.isChecked()
+            shown = [k for k in new if show_all or untrans_only and k not in self.trans]
+            if not self.model.insert_rows(shown, dict(izip(items, count()))):
+                # keys moved in the file too
+                self.on_untransbox()
+        if self.edited_key in self.model.rows:
+            self.edited_row = self.model.rows[self.edited_key]
+        if removed or new:
+            # indexed in the order of origins again by the next search
+            self.search_index.reset(self.origins, self.trans)
+        if self.filterEdit.text():
+            # changed or new rows may match the filter
+            self.start_search()
+        self.check_translations({'original': duplicates, 'translated': self.lint.duplicates.get('translated', [])})
+        self.base.compare(self.origins, self.trans)
+        self.model.keys_changed(self.model.keys)
+        self.update_status_bar()
+        self.update_bottom()
+
+        logger.info("Merged %s: %d changed or new, %d removed keys" % (self.origfname, len(changed), len(removed)))
+        self.window.statusBar().showMessage('Merged changes of ' + self.origfname, 5000)
+
+    def merge_translations(self, items, spans, stat):
+        '''
+        Three-way merge of the translated file changed on disk, the checkpoint being the common base:
+        keys changed only on disk are taken, keys edited only here are kept, the user chooses for
+        keys changed both ways differently.
+        '''
+        dirty = self.model.dirty
+        mine = dict(self.trans.iteritems())
+        merged = OrderedDict(items)     # in the order of the file
+        changed = []        # keys whose row has to be updated
+        conflicts = []
+
+        for key in set(mine) | set(dirty) | set(items):
+            item, theirs = mine.get(key), items.get(key)
+            if key not in dirty:
+                if item != theirs:
+                    changed.append(key)
+            elif text_of(theirs) == dirty[key]:
+                # not changed on disk
+                self.keep_mine(merged, key, item)
+            elif text_of(theirs) == text_of(item):
+                # same change made in both places
+                del dirty[key]
+                changed.append(key)
+            else:
+                conflicts.append(key)
+
+        if conflicts:
+            order = dict(izip(self.origins, count()))
+            conflicts.sort(key=lambda k: order.get(k, len(order)))
+        choice = None
+        for key in conflicts:
+            item, theirs = mine.get(key), items.get(key)
+            if choice is None or not choice.startswith('all'):
+                choice = self.resolve_conflict(key, text_of(item), text_of(theirs))
+            if choice.endswith('mine'):
+                self.keep_mine(merged, key, item)
+                # the file has the other text now
+                dirty[key] = text_of(theirs)
+            else:
+                del dirty[key]
+            changed.append(key)
+
+        # in place, the model and the search index refer to the same dictionary
+        self.trans.clear()
+        self.trans.update(merged)
+        self.trans_spans = spans
+        self.trans_stat = stat
+        for key in changed:
+            self.search_index.update(key)
+            self.consistency.update(key)
+            self.lint.update(key)
+            self.base.update(key, self.origins, self.trans)
+        self.model.keys_changed(changed)
+        self.issues_changed()
+        self.model.dirty_changed.emit(len(dirty))
+        # keys taken from the disk must not be overwritten by a replay
+        self.reset_journal()
+
+        logger.info("Merged %s: %d changed keys, %d conflicts" % (self.transfname, len(changed), len(conflicts)))
+        self.window.statusBar().showMessage('Merged changes of ' + self.transfname, 5000)
+
+    def keep_mine(self, merged, key, item):
+        if item is not None:
+            merged[key] = item
+        else:
+            merged.pop(key, None)
+
+    def resolve_conflict(self, key, mine, theirs):
+        ''' :return: 'mine', 'theirs', 'all mine' or 'all theirs' '''
+        box = QMessageBox(self.window)
+        box.setIcon(QMessageBox.Warning)
+        box.setWindowTitle("Conflicting change")
+        box.setText("The translation of '%s' has been changed in %s and here too." % (key, self.transfname))
+        box.setInformativeText("Here:\n%s\n\nOn disk:\n%s" % (mine or '(none)', theirs or '(none)'))
+        choices = [(box.addButton("Keep &mine", QMessageBox.AcceptRole), 'mine'),
+                   (box.addButton("Use &disk version", QMessageBox.RejectRole), 'theirs'),
+                   (box.addButton("Keep mine for &all", QMessageBox.AcceptRole), 'all mine'),
+                   (box.addButton("Use disk for a&ll", QMessageBox.RejectRole), 'all theirs')]
+        box.setDefaultButton(choices[0][0])
+        box.exec_()
+        clicked = box.clickedButton()
+        for button, choice in choices:
+            if button == clicked:
+                return choice
+        return 'mine'
+
+    def add_originals(self, items, error):
+        if error is not None:
+            emsg = "Error opening original file: " + self.load_worker.origname + "\n" + str(error)
+            logger.error(emsg)
+            error_popup(emsg)
+            return
+
+        if not self.origins:
+            # first chunk, a lazily parsed dictionary comes in one piece
+            self.origins = items
+            if self.config.get_lazy_load():
+                # texts are decoded for the index only when searching
+                self.search_index.reset(self.origins, self.trans)
+            else:
+                self.search_index.build(self.origins, self.trans)
+            self.on_untransbox()
+            self.table_select_item(0, 2) # select first translation
+        else:
+            # a key repeated later in the file changes the original text only
+            repeated = [k for k in items if k in self.origins]
+            new = [(k, item) for k, item in items.iteritems() if k not in self.origins]
+            self.origins.update(items)
+            for key in repeated:
+                self.search_index.update(key)
+                if key in self.model.rows:
+                    self.model.row_changed(self.model.rows[key])
+            self.search_index.append(new)
+
+            # outdated keys are only known when the whole file is loaded, see on_load_finished
+            untrans_only = self.untransOnlyBox.isChecked()
+            show_all = not untrans_only and not self.outdatedOnlyBox.isChecked()
+            keys = [k for k, item in new if show_all or untrans_only and k not in self.trans]
+            if DEBUG_ROWLIMIT is not None:
+                keys = keys[:max(0, DEBUG_ROWLIMIT - self.model.rowCount())]
+            self.model.append_rows(keys)
+            if self.filterEdit.text():
+                # new rows may match the filter
+                self.start_search()
+        self.update_status_bar()
 
 class MyOptionsDialog(Ui_OptionsDialog):
     def __init__(self, dialog, callback):
@@ -695,6 +2365,46 @@ class MyOptionsDialog(Ui_OptionsDialog):
         else:
             logger.error("Invalid base file: " + fullpath)            
             
+class MyIssuesDialog(Ui_IssuesDialog):
+    ''' Non-modal list of the issues found by the LintIndex, double-click selects the key '''
+    def __init__(self, dialog, lint, callback):
+        Ui_IssuesDialog.__init__(self)
+        self.setupUi(dialog)
+        self.window = dialog
+        self.lint = lint
+        self.callback = callback    # called with the key of the issue double-clicked
+
+        self.ruleCombo.addItem('All rules', None)
+        for rule, name in RULE_NAMES.iteritems():
+            self.ruleCombo.addItem(name, rule)
+        self.ruleCombo.currentIndexChanged.connect(self.refresh)
+        self.filterEdit.textChanged.connect(self.refresh)
+        self.issueList.itemDoubleClicked.connect(self.on_issue_used)
+        self.closeButton.clicked.connect(self.window.close)
+
+    def refresh(self, *args):
+        rule = self.ruleCombo.itemData(self.ruleCombo.currentIndex())
+        text = self.filterEdit.text().lower()
+        issues = self.lint.list(rule)
+        self.issueList.clear()
+        matches = 0
+        for issue in issues:
+            label = u'%s: %s' % (issue.key, issue.message)
+            if text and text not in label.lower():
+                continue
+            matches += 1
+            if matches <= ISSUES_SHOWN:
+                item = QtGui.QListWidgetItem(label)
+                item.setData(QtCore.Qt.UserRole, issue.key)
+                self.issueList.addItem(item)
+        if matches > ISSUES_SHOWN:
+            self.countLabel.setText('%d of %d issues (first %d shown)' % (matches, len(issues), ISSUES_SHOWN))
+        else:
+            self.countLabel.setText('%d of %d issues' % (matches, len(issues)))
+
+    def on_issue_used(self, item):
+        self.callback(item.data(QtCore.Qt.UserRole))
+
 class MyConfig(ConfigParser, object):
     def __init__(self):
         ConfigParser.__init__(self)
@@ -731,7 +2441,15 @@ class MyConfig(ConfigParser, object):
             ('files', 'orig', ''),
             ('files', 'trans', ''),
             ('options', 'cleanup_keys_on_save', 'False'),
-            ('options', 'copy_comments', 'False')
+            ('options', 'copy_comments', 'False'),
+            ('options', 'lazy_load', 'False'),
+            ('options', 'parse_cache', 'True'),
+            ('options', 'parse_cache_mb', '200'),
+            ('options', 'project_mode', 'False'),
+            ('options', 'memory_imports', ''),
+            ('options', 'undo_memory_mb', '16'),
+            ('options', 'show_timings', 'False'),
+            ('options', 'profile', '')
             # bool values must be set to string to avoid 
             #    "TypeError: argument of type 'bool' is not iterable"
             # see http://stackoverflow.com/a/21485083/501814
@@ -755,6 +2473,8 @@ class MyConfig(ConfigParser, object):
         self.dialog.transFileEdit.setText(self.get('files', 'trans'))
         self.dialog.cleanupBox.setChecked(self.getboolean('options', 'cleanup_keys_on_save'))
         self.dialog.copyCommentBox.setChecked(self.getboolean('options', 'copy_comments'))
+        self.dialog.lazyLoadBox.setChecked(self.getboolean('options', 'lazy_load'))
+        self.dialog.projectBox.setChecked(self.getboolean('options', 'project_mode'))
         self.callback = callback
         
     def open_options_done(self):
@@ -764,6 +2484,8 @@ class MyConfig(ConfigParser, object):
         self.set('files', 'trans', d.transFileEdit.text())
         self.set('options', 'cleanup_keys_on_save', str(d.cleanupBox.isChecked()))
         self.set('options', 'copy_comments', str(d.copyCommentBox.isChecked()))
+        self.set('options', 'lazy_load', str(d.lazyLoadBox.isChecked()))
+        self.set('options', 'project_mode', str(d.projectBox.isChecked()))
         
         # store changes in ini
         logger.info("Options processed")
@@ -776,6 +2498,36 @@ class MyConfig(ConfigParser, object):
     def get_transfname(self): return self.get('files', 'trans')
     def get_cleanup_keys(self): return self.getboolean('options', 'cleanup_keys_on_save')
     def get_copy_comments(self): return self.getboolean('options', 'copy_comments')
+    def get_lazy_load(self): return self.getboolean('options', 'lazy_load')
+    def get_project_mode(self): return self.getboolean('options', 'project_mode')
+
+    def get_undo_memory(self): return self.getint('options', 'undo_memory_mb') << 20
+    def get_show_timings(self): return self.getboolean('options', 'show_timings')
+    def get_profile(self): return self.get('options', 'profile')
+
+    def get_memory_imports(self):
+        ''' :return: translated files used for the translation memory besides the edited one '''
+        return [fname for fname in self.get('options', 'memory_imports').split('|') if fname]
+
+    def add_memory_import(self, fname):
+        fnames = self.get_memory_imports()
+        if fname not in fnames:
+            self.set('options', 'memory_imports', '|'.join(fnames + [fname]))
+
+    def get_parse_cache(self):
+        ''' :return: ParseCache in a directory next to the ini file, None if disabled '''
+        if not self.getboolean('options', 'parse_cache'):
+            return None
+        dirname = os.path.join(os.path.dirname(os.path.abspath(self.fname)), CACHE_DIRNAME)
+        return ParseCache(dirname, self.getint('options', 'parse_cache_mb') << 20)
+
+def text_of(item):
+    ''' :return: translation of a TransItem, '' for None '''
+    return item.trans if item is not None else ''
+
+def strip_original(item):
+    # remove leading spaces in original translation coming from 'key = translation' strings
+    item.trans = item.trans.lstrip(' ')
 
 def is_same_dir(first, second):
     # should be using os.path.samefile(path1, path2) under Unix...
@@ -795,6 +2547,14 @@ def is_same_dir(first, second):
     #print rel1, rel2
     return rel1 == rel2
 
+def file_stat(fname):
+    ''' :return: (size, modification time) of a file, or None if it can not be accessed '''
+    try:
+        st = os.stat(fname)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime
+
 def get_basepath(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
     try:
@@ -817,6 +2577,9 @@ def setup_logging():
     return logger
     
 if __name__ == "__main__":
+    # locales of a project are parsed in child processes, also from the frozen executable
+    multiprocessing.freeze_support()
+
     config = MyConfig()
     workdir = '.'
     
@@ -833,9 +2596,33 @@ if __name__ == "__main__":
         config.save(ININAME)
   
 
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description=VERSION_STR)
+    parser.add_argument('--profile', metavar='FILE',
+                        help="profile the session with cProfile, the stats are written to FILE on exit")
+    # the rest is for Qt
+    args, qt_args = parser.parse_known_args()
+    profile_fname = args.profile or config.get_profile()
+    profiler = None
+    if profile_fname:
+        import cProfile
+        logger.info("Profiling the session to " + profile_fname)
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    app = QApplication(sys.argv[:1] + qt_args)
     window = QMainWindow()
     awindow = ApropyMainWindow(app, window, config)
     window.show()
-  
-    sys.exit(app.exec_())
+
+    code = app.exec_()
+    if profiler is not None:
+        import pstats
+        # only the main thread is profiled, the workers are in the timings
+        profiler.disable()
+        profiler.dump_stats(profile_fname)
+        out = StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(30)
+        logger.info("Profile written to %s, top functions:\n%s" % (profile_fname, out.getvalue()))
+    for line in timings.summary():
+        logger.info("Timing " + line)
+    sys.exit(code)
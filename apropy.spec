@@ -16,7 +16,8 @@ a = Analysis(['apropy.py'],
 
 a.datas += [('globe.png','globe.png', 'Data')]             
              
-skiplist = [  'bz2', 'unicodedata', 'ctypes', 'ssl', 'win32', 'PyQt4',
+# _ctypes is kept: prop.replace_file needs it to replace the saved file atomically
+skiplist = [  'bz2', 'unicodedata', 'ssl', 'win32', 'PyQt4',
                 'svg', 'select', 'opengl', 'xml', 'wintypes'] #, 'shiboken' ]
 
 newbins = []                
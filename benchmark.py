@@ -0,0 +1,273 @@
+# Apropy - a Java properties file editor in python.
+# Copyright (C) 2016 Andras Szell
+
+'''
+Times the main operations of the editor on generated bundles:
+
+    python benchmark.py [--keys 1000,10000,100000] [--output FILE] [--compare FILE]
+
+The bundles have a controllable number of keys, share of commented items, of multiline values and
+of non Latin-1 characters. File operations (propread, propsave) need nothing but the parser, the
+memory taken by the loaded dictionaries is measured too (bytes per key of the original file),
+the model operations (fill_model, filtering, checkpointing, HighlightModel.data) run with a Qt
+application, they are left out if PySide can not be imported or there is no display. Qt 4 needs an
+X server on Linux, on a headless machine run it under a virtual one: xvfb-run python benchmark.py
+Results are written as JSON; with --compare the times are printed next to the ones of an earlier run.
+'''
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import tempfile
+import argparse
+from array import array
+from collections import OrderedDict
+
+from prop import propread, propsave, propserialize, TransItem
+
+SIZES = [1000, 10000, 100000]
+REPEAT = 3
+
+ASCII_WORDS = ['file', 'save', 'open', 'player', 'army', 'province', 'gold', 'turn', 'attack',
+               'defend', 'the', 'of', 'to', 'is', 'not', 'your', 'enemy', 'game', 'option', 'error']
+LATIN_WORDS = [u'f\xe1jl', u'ment\xe9s', u'j\xe1t\xe9kos', u'sc\xe8ne', u'gr\xf6\xdfe', u'ma\xf1ana']
+NONLATIN_WORDS = [u'\u0444\u0430\u0439\u043b', u'\u0438\u0433\u0440\u043e\u043a', u'\u6587\u4ef6',
+                  u'\u4fdd\u5b58', u'\u30b2\u30fc\u30e0', u'\u03c0\u03b1\u03af\u03ba\u03c4\u03b7\u03c2']
+
+def generate_items(keys, comments=0.2, multiline=0.05, nonlatin=0.0, words=(4, 12), seed=1, prefix=''):
+    '''
+    :param keys: number of items
+    :param comments: share of the items with a comment
+    :param multiline: share of the values continued on more lines
+    :param nonlatin: share of the words not in Latin-1 (written as \\uXXXX escapes)
+    :return: OrderedDict of TransItems as propread returns them
+    '''
+    rnd = random.Random(seed)
+
+    def text():
+        parts = []
+        for i in range(rnd.randint(*words)):
+            if rnd.random() < nonlatin:
+                parts.append(rnd.choice(NONLATIN_WORDS))
+            elif rnd.random() < 0.1:
+                parts.append(rnd.choice(LATIN_WORDS))
+            else:
+                parts.append(rnd.choice(ASCII_WORDS))
+        if rnd.random() < 0.1:
+            parts.append(u'{0}')
+        return prefix + u' '.join(parts)
+
+    items = OrderedDict()
+    for i in xrange(keys):
+        key = u'module%d.section%d.key%d' % (i % 37, i % 101, i)
+        comment = u'# %s\n' % text() if rnd.random() < comments else u''
+        value = text()
+        if rnd.random() < multiline:
+            value += u' \\\n    ' + text()
+        items[key] = TransItem(key, comment, value)
+    return items
+
+def generate_bundle(dirname, keys, translated=0.8, **kwargs):
+    '''
+    Write a base file and a translation of the given share of its keys to dirname.
+    :param kwargs: see generate_items
+    :return: names of the base and the translated file
+    '''
+    origins = generate_items(keys, **kwargs)
+    kwargs['seed'] = kwargs.get('seed', 1) + 1
+    texts = generate_items(keys, prefix=u'hu ', **kwargs)
+    rnd = random.Random(kwargs['seed'])
+    trans = OrderedDict((key, TransItem(key, origins[key].comment, item.trans)) for key, item in texts.iteritems()
+                        if rnd.random() < translated)
+
+    origname = os.path.join(dirname, 'msg_bundle.properties')
+    transname = os.path.join(dirname, 'msg_bundle_hu.properties')
+    for fname, items in ((origname, origins), (transname, trans)):
+        with open(fname, 'wb') as fout:
+            fout.write(propserialize(items.itervalues()))
+    return origname, transname
+
+def best_time(function, repeat=REPEAT):
+    ''' :return: the shortest of repeat runs in seconds, and the result of the last one '''
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        result = function()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def memory_size(*dicts):
+    ''' :return: bytes taken by the dictionaries of TransItems, each string object counted once '''
+    seen = set()
+    total = 0
+    for items in dicts:
+        # an OrderedDict keeps a [prev, next, key] list per key besides the dict
+        total += sys.getsizeof(items) + len(items) * sys.getsizeof([None] * 3)
+        for key, item in items.iteritems():
+            for obj in (key, item, item.key, item.comment, item.trans):
+                if id(obj) not in seen:
+                    seen.add(id(obj))
+                    total += sys.getsizeof(obj)
+    return total
+
+def benchmark_files(origname, transname, results):
+    def read(fname, strings=None):
+        with open(fname, 'rb') as fin:
+            return propread(fin, strings=strings)
+
+    results['propread'], origins = best_time(lambda: read(origname))
+    # loaded as by LoadWorker, sharing the keys and comments
+    strings = {}
+    trans = read(transname, strings)
+    origins = read(origname, strings)
+    results['bytes_per_key'] = memory_size(origins, trans) / float(len(origins))
+
+    savename = transname + '.saved'
+    def save():
+        with open(savename, 'wb') as fout:
+            propsave(fout, trans)
+    results['propsave'], count = best_time(save)
+    return origins, trans
+
+def start_qt():
+    ''' :return: the QApplication, None if PySide is missing or there is no display '''
+    if os.name == 'posix' and sys.platform != 'darwin' and not os.environ.get('DISPLAY'):
+        # QApplication of Qt 4 aborts the process without an X server
+        return None
+    try:
+        from PySide.QtGui import QApplication
+    except ImportError:
+        return None
+    return QApplication.instance() or QApplication([])
+
+def benchmark_model(origins, trans, results):
+    from PySide import QtCore
+    from apropy import HighlightModel, FilterProxyModel
+    from search import SearchIndex, SearchQuery
+
+    for item in origins.itervalues():
+        item.trans = item.trans.lstrip(' ')
+    trans = OrderedDict(trans)
+
+    def update(key, text):
+        # the same as ApropyMainWindow.update_translation, without the indexes
+        if text.strip():
+            trans[key] = TransItem(key, trans[key].comment if key in trans else u'', text)
+        else:
+            trans.pop(key, None)
+
+    model = HighlightModel()
+    model.updater = update
+    proxy = FilterProxyModel()
+    proxy.setSourceModel(model)
+
+    # ApropyMainWindow.fill_model without the widgets
+    results['fill_model'], _ = best_time(lambda: model.set_rows(origins, trans, origins.keys()))
+
+    index = SearchIndex()
+    results['search_index'], _ = best_time(lambda: index.build(origins, trans))
+    query = SearchQuery(u'enemy gold')
+    def search():
+        index.results.clear()
+        keys = index.search(query)
+        proxy.set_keys(keys)
+        return keys
+    results['filter'], keys = best_time(search)
+    proxy.set_keys(None)
+
+    # a page of the table, as painted
+    roles = [QtCore.Qt.DisplayRole, QtCore.Qt.TextColorRole, QtCore.Qt.FontRole, QtCore.Qt.DecorationRole]
+    rows = range(0, model.rowCount(), max(1, model.rowCount() // 1000))
+    indexes = [model.index(row, col) for row in rows for col in range(model.columnCount())]
+    def paint():
+        # row states computed again, as after a change
+        model.states = array('B', [0]) * len(model.keys)
+        for index in indexes:
+            for role in roles:
+                model.data(index, role)
+    results['data_per_call'], _ = best_time(paint)
+    results['data_per_call'] /= len(indexes) * len(roles)
+
+    # a tenth of the keys edited, then saved
+    edited = origins.keys()[::10]
+    def checkpoint():
+        model.create_checkpoint({}, reset=True)
+        model.set_translations(edited, u'edited')
+        saved = dict((key, u'edited') for key in edited)
+        start = time.time()
+        model.create_checkpoint(saved)
+        return time.time() - start
+    results['checkpoint'] = min(checkpoint() for i in range(REPEAT))
+
+def run(sizes, **kwargs):
+    ''' :return: dict of the results, see main() '''
+    app = start_qt()
+    report = OrderedDict([
+        ('time', time.strftime('%Y-%m-%d %H:%M:%S')),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('parameters', kwargs),
+        ('qt', app is not None),
+        ('sizes', OrderedDict()),
+    ])
+    for size in sizes:
+        dirname = tempfile.mkdtemp(prefix='apropy_benchmark')
+        try:
+            start = time.time()
+            origname, transname = generate_bundle(dirname, size, **kwargs)
+            results = OrderedDict([('generate', time.time() - start),
+                                   ('file_size', os.path.getsize(origname))])
+            origins, trans = benchmark_files(origname, transname, results)
+            if app is not None:
+                benchmark_model(origins, trans, results)
+        finally:
+            shutil.rmtree(dirname)
+        report['sizes'][str(size)] = results
+        print_results(size, results)
+    return report
+
+def print_results(size, results, previous=None):
+    print "%d keys" % size
+    for name, value in results.iteritems():
+        if name == 'file_size':
+            continue
+        unit = 'B' if name == 'bytes_per_key' else 's'
+        line = "    %-14s %10.6f %s" % (name, value, unit)
+        if previous is not None and previous.get(name):
+            line += "  %6.2fx of %.6f s" % (value / previous[name], previous[name])
+        print line
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time apropy on generated bundles.")
+    parser.add_argument('--keys', default=','.join(map(str, SIZES)),
+                        help="comma separated bundle sizes (default: %(default)s)")
+    parser.add_argument('--comments', type=float, default=0.2, help="share of commented items")
+    parser.add_argument('--multiline', type=float, default=0.05, help="share of multiline values")
+    parser.add_argument('--nonlatin', type=float, default=0.05, help="share of non Latin-1 words")
+    parser.add_argument('--output', default='benchmark.json', help="JSON file of the results (default: %(default)s)")
+    parser.add_argument('--compare', metavar='FILE', help="JSON file of an earlier run to compare with")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.keys.split(',')]
+    report = run(sizes, comments=args.comments, multiline=args.multiline, nonlatin=args.nonlatin)
+    if not report['qt']:
+        print "PySide or a display not found, model benchmarks skipped"
+    with open(args.output, 'wb') as fout:
+        json.dump(report, fout, indent=1)
+    print "Results written to " + args.output
+
+    if args.compare:
+        with open(args.compare, 'rb') as fin:
+            previous = json.load(fin)
+        print "Compared with %s (%s)" % (args.compare, previous['time'])
+        for size in sizes:
+            print_results(size, report['sizes'][str(size)], previous['sizes'].get(str(size)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# Apropy - a Java properties file editor in python.
+# Copyright (C) 2016 Andras Szell
+
+import os
+import marshal
+import hashlib
+import logging
+from array import array
+from collections import OrderedDict
+
+from prop import PropSpans, TransItem, atomic_write
+
+logger = logging.getLogger("apropy")
+
+FORMAT = 2      # increase when the contents of the entries change
+
+class ParseCache(object):
+    '''
+    Parsed properties files stored on disk, one entry file per parsed file and variant.
+    An entry is valid while the size and modification time of the file are the same as when it
+    was stored; if only the time differs, the md5 hash of the contents decides.
+    The least recently used entries are deleted when the directory grows over max_size bytes.
+    '''
+    def __init__(self, dirname, max_size=200 << 20):
+        self.dirname = dirname
+        self.max_size = max_size
+
+    def entry_name(self, fname, variant):
+        path = os.path.normcase(os.path.abspath(fname))
+        return os.path.join(self.dirname, hashlib.md5(path + '|' + variant).hexdigest() + '.cache')
+
+    def load(self, fname, variant='', strings=None):
+        '''
+        :param strings: interning table, see unpack
+        :return: (items, spans, duplicates) as stored for fname, or None if there is no valid entry
+        '''
+        payload = self.read(fname, variant)
+        return unpack(payload, strings) if payload is not None else None
+
+    def read(self, fname, variant=''):
+        ''' :return: the payload stored for fname (see pack), or None if there is no valid entry '''
+        entry = self.entry_name(fname, variant)
+        try:
+            st = os.stat(fname)
+            with open(entry, 'rb') as fin:
+                header = marshal.load(fin)
+                if header['format'] != FORMAT or header['size'] != st.st_size:
+                    return None
+                if header['mtime'] != st.st_mtime and header['md5'] != file_md5(fname):
+                    return None
+                payload = marshal.load(fin)
+        except (IOError, OSError, EOFError, ValueError, TypeError, KeyError):
+            return None
+
+        # most recently used entries are kept by evict()
+        try:
+            os.utime(entry, None)
+        except OSError:
+            # evicted meanwhile by an other process (project mode)
+            return None
+        return payload
+
+    def store(self, fname, items, spans=None, variant='', data=None, st=None, duplicates=None):
+        ''' Store the items parsed from fname (and their offsets and repeated keys), then evict old entries.
+        :param data: the contents parsed, to be hashed instead of reading the file again
+        :param st: os.stat result of the file taken before reading it
+        '''
+        try:
+            if st is None:
+                st = os.stat(fname)
+            md5 = hashlib.md5(data).hexdigest() if data is not None else file_md5(fname)
+            header = {'format': FORMAT, 'size': st.st_size, 'mtime': st.st_mtime, 'md5': md5}
+            if not os.path.isdir(self.dirname):
+                os.makedirs(self.dirname)
+            atomic_write(self.entry_name(fname, variant), marshal.dumps(header) + marshal.dumps(pack(items, spans, duplicates)))
+            self.evict()
+        except (IOError, OSError, ValueError), e:
+            # the cache is only an optimisation
+            logger.warn("Unable to store parse cache of %s: %s" % (fname, e))
+
+    def evict(self):
+        ''' Delete least recently used entries until the cache fits in max_size '''
+        entries = []
+        for name in os.listdir(self.dirname):
+            if name.endswith('.cache'):
+                path = os.path.join(self.dirname, name)
+                st = os.stat(path)
+                entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            total -= size
+            logger.debug("Evicted parse cache entry " + path)
+
+def pack(items, spans=None, duplicates=None):
+    ''' :return: items, spans and the list of duplicate keys as builtin types only, for marshal '''
+    payload = {'items': [(item.key, item.comment, item.trans) for item in items.itervalues()],
+               'spans': None, 'duplicates': list(duplicates or [])}
+    if spans is not None:
+        keys = sorted(spans.index, key=spans.index.get)
+        # removed items leave holes in the arrays
+        if len(keys) == len(spans.ends):
+            payload['spans'] = (keys, spans.cstarts.tostring(), spans.vstarts.tostring(),
+                                spans.ends.tostring())
+    return payload
+
+def unpack(payload, strings=None):
+    '''
+    :param strings: dict used to intern keys and comments: equal strings of all the dictionaries
+        (and spans) unpacked with the same table are stored only once
+    :return: (items, spans, duplicates) of a payload made by pack, spans is None if it was not stored
+    '''
+    if strings is None:
+        items = OrderedDict((key, TransItem(key, comment, trans)) for key, comment, trans in payload['items'])
+    else:
+        intern = strings.setdefault
+        items = OrderedDict()
+        for key, comment, trans in payload['items']:
+            key = intern(key, key)
+            items[key] = TransItem(key, intern(comment, comment), trans)
+
+    spans = None
+    if payload['spans'] is not None:
+        keys, cstarts, vstarts, ends = payload['spans']
+        if strings is not None:
+            keys = [strings.get(key, key) for key in keys]
+        spans = PropSpans()
+        spans.index = dict((key, i) for i, key in enumerate(keys))
+        spans.cstarts = array('l', cstarts)
+        spans.vstarts = array('l', vstarts)
+        spans.ends = array('l', ends)
+    return items, spans, payload['duplicates']
+
+def file_md5(fname):
+    md5 = hashlib.md5()
+    with open(fname, 'rb') as fin:
+        for block in iter(lambda: fin.read(1 << 20), ''):
+            md5.update(block)
+    return md5.hexdigest()
+
+def benchmark_cache(fname, repeat=3):
+    ''' Time parsing fname against loading it from a temporary cache '''
+    import time
+    import shutil
+    import tempfile
+    from prop import propread
+
+    dirname = tempfile.mkdtemp()
+    try:
+        cache = ParseCache(dirname)
+        results = {}
+        for name in ['parse', 'cache']:
+            best = None
+            for i in range(repeat):
+                start = time.time()
+                if name == 'parse':
+                    spans = PropSpans()
+                    with open(fname, 'rb') as fin:
+                        items = propread(fin, spans)
+                else:
+                    items, spans, duplicates = cache.load(fname)
+                elapsed = time.time() - start
+                best = elapsed if best is None else min(best, elapsed)
+            if name == 'parse':
+                cache.store(fname, items, spans)
+            results[name] = items
+            print "%-8s %7.3f s  %d items" % (name, best, len(items))
+
+        if results['parse'] != results['cache']:
+            print "ERROR: cache returned different items"
+    finally:
+        shutil.rmtree(dirname)
+
+if __name__ == "__main__":
+    import sys
+
+    for fname in sys.argv[1:]:
+        print fname
+        benchmark_cache(fname)
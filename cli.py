@@ -0,0 +1,195 @@
+# Apropy - a Java properties file editor in python.
+# Copyright (C) 2016 Andras Szell
+
+'''
+Checks and normalises bundles without the GUI, e.g. in a nightly build:
+
+    python cli.py [options] DIR_OR_BASE_FILE...
+
+Every base file found (msg_bundle.properties by default) is checked with all its locales next to it
+(msg_bundle_*.properties): translation progress, missing and obsolete keys, and whether the file
+is in the form apropy saves it (keys in base file order, obsolete keys removed). With --fix such
+files are rewritten. Files are processed in parallel by a pool of processes.
+The exit status is 1 if a file could not be read, or with --strict if any file needs fixing.
+'''
+
+import os
+import sys
+import json
+import time
+import fnmatch
+import argparse
+import multiprocessing
+from itertools import imap
+from cStringIO import StringIO
+
+from prop import propread, propserialize, propreorder, atomic_write
+from project import find_locales
+
+BASE_PATTERN = 'msg_bundle.properties'
+
+# base file -> (size, modification time, keys in file order), parsed once per worker process
+base_files = {}
+BASE_FILES_KEPT = 8
+
+def find_bundles(paths, pattern=BASE_PATTERN):
+    ''' :return: list of (base file, OrderedDict of locale -> file) for the base files in paths '''
+    bases = []
+    for path in paths:
+        if os.path.isfile(path):
+            bases.append(path)
+            continue
+        for dirpath, dirnames, fnames in os.walk(path):
+            dirnames.sort()
+            bases.extend(os.path.join(dirpath, fname) for fname in sorted(fnames) if fnmatch.fnmatch(fname, pattern))
+    return [(base, find_locales(base)) for base in bases]
+
+def base_keys(fname):
+    ''' :return: keys of the base file in file order '''
+    st = os.stat(fname)
+    cached = base_files.get(fname)
+    if cached is not None and cached[:2] == (st.st_size, st.st_mtime):
+        return cached[2]
+    with open(fname, 'rb') as fin:
+        keys = propread(fin).keys()
+    if len(base_files) >= BASE_FILES_KEPT:
+        base_files.clear()
+    base_files[fname] = (st.st_size, st.st_mtime, keys)
+    return keys
+
+def check_locale(args):
+    '''
+    Check one translated file, runs in a worker process.
+    :param args: (base file, locale name, translated file, fix)
+    :return: dict of the results, see main()
+    '''
+    base, locale, fname, fix = args
+    result = {'base': base, 'locale': locale, 'file': fname}
+    start = time.time()
+    try:
+        keys = base_keys(base)
+        with open(fname, 'rb') as fin:
+            data = fin.read()
+        trans = propread(StringIO(data))
+
+        # an empty translation is the same as none in the editor
+        missing = [k for k in keys if k not in trans or not trans[k].trans.strip()]
+        normal = propreorder(trans, keys)
+        obsolete = [k for k in trans if k not in normal]
+        normalised = propserialize(normal.itervalues())
+
+        result.update({
+            'keys': len(keys),
+            'translated': len(keys) - len(missing),
+            'missing': missing,
+            'obsolete': obsolete,
+            'normalised': normalised == data,
+            'fixed': False,
+        })
+        if fix and normalised != data:
+            atomic_write(fname, normalised)
+            result['fixed'] = True
+    except Exception, e:
+        result['error'] = str(e)
+    result['elapsed'] = time.time() - start
+    return result
+
+def run(bundles, fix=False, jobs=None):
+    ''' Generates the results of check_locale for every locale of the bundles, in order '''
+    tasks = [(base, locale, fname, fix) for base, locales in bundles for locale, fname in locales.iteritems()]
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+    if jobs <= 1 or len(tasks) <= 1:
+        for result in imap(check_locale, tasks):
+            yield result
+        return
+
+    pool = multiprocessing.Pool(jobs)
+    try:
+        # locales of a bundle go to the same process mostly, so its base file is parsed once there
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        for result in pool.imap(check_locale, tasks, chunksize):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+def summarize(results):
+    ''' :return: totals of all the results and translation progress per locale '''
+    summary = {'bundles': len(set(r['base'] for r in results)), 'files': len(results),
+               'errors': 0, 'missing': 0, 'obsolete': 0, 'not_normalised': 0, 'fixed': 0, 'locales': {}}
+    for r in results:
+        if 'error' in r:
+            summary['errors'] += 1
+            continue
+        summary['missing'] += len(r['missing'])
+        summary['obsolete'] += len(r['obsolete'])
+        summary['not_normalised'] += not r['normalised']
+        summary['fixed'] += r['fixed']
+        locale = summary['locales'].setdefault(r['locale'], {'keys': 0, 'translated': 0})
+        locale['keys'] += r['keys']
+        locale['translated'] += r['translated']
+    for locale in summary['locales'].itervalues():
+        locale['percent'] = round(100.0 * locale['translated'] / locale['keys'], 1) if locale['keys'] else 100.0
+    return summary
+
+def print_result(r, list_keys):
+    if 'error' in r:
+        print "%-8s ERROR %s: %s" % (r['locale'], r['file'], r['error'])
+        return
+    state = 'fixed' if r['fixed'] else 'ok' if r['normalised'] else 'unnormalised'
+    percent = 100.0 * r['translated'] / r['keys'] if r['keys'] else 100.0
+    print "%-8s %6d/%-6d %5.1f%%  missing %-6d obsolete %-6d %-12s %s" % (
+        r['locale'], r['translated'], r['keys'], percent, len(r['missing']), len(r['obsolete']), state, r['file'])
+    if list_keys:
+        for key in r['missing']:
+            print "    missing:  " + key.encode('unicode_escape')
+        for key in r['obsolete']:
+            print "    obsolete: " + key.encode('unicode_escape')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check and normalise Java properties bundles.")
+    parser.add_argument('paths', nargs='+', metavar='PATH', help="directory to search or base file")
+    parser.add_argument('--base', default=BASE_PATTERN, metavar='PATTERN',
+                        help="file name pattern of the base files (default: %(default)s)")
+    parser.add_argument('--fix', action='store_true', help="reorder and normalise the translated files")
+    parser.add_argument('--strict', action='store_true', help="exit with 1 if any file needs fixing")
+    parser.add_argument('--json', action='store_true', help="print the results as one JSON document")
+    parser.add_argument('--keys', action='store_true', help="list the missing and obsolete keys")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="number of processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    bundles = find_bundles(args.paths, args.base)
+    results = []
+    for r in run(bundles, args.fix, args.jobs):
+        if not args.json:
+            print_result(r, args.keys)
+        results.append(r)
+    summary = summarize(results)
+    summary['elapsed'] = round(time.time() - start, 3)
+
+    if args.json:
+        if not args.keys:
+            for r in results:
+                if 'error' not in r:
+                    r['missing'] = len(r['missing'])
+                    r['obsolete'] = len(r['obsolete'])
+        json.dump({'files': results, 'summary': summary}, sys.stdout, indent=1, sort_keys=True)
+        print
+    else:
+        for name, locale in sorted(summary['locales'].iteritems()):
+            print "%-8s %5.1f%%  (%d of %d keys)" % (name, locale['percent'], locale['translated'], locale['keys'])
+        print "%(files)d files of %(bundles)d bundles in %(elapsed).2f s: %(errors)d errors, " \
+              "%(missing)d missing and %(obsolete)d obsolete keys, %(not_normalised)d files to fix, " \
+              "%(fixed)d fixed" % summary
+
+    if summary['errors']:
+        return 1
+    if args.strict and summary['not_normalised'] > summary['fixed']:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
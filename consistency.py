@@ -0,0 +1,97 @@
+# Apropy - a Java properties file editor in python.
+# Copyright (C) 2016 Andras Szell
+
+def normalise(text):
+    ''' :return: text with whitespace runs made single spaces, the same object if it has none '''
+    norm = u' '.join(text.split())
+    return text if norm == text else norm
+
+class ConsistencyIndex(object):
+    '''
+    Keys grouped by their normalised original text, and the groups whose translated keys have
+    different translations. Groups are found through a dict, so keeping it current after an edit
+    costs the size of the group of the key only.
+    '''
+    def __init__(self):
+        self.origins = {}
+        self.trans = {}
+        self.groups = {}            # normalised original -> keys having it, in origins order
+        self.inconsistent = set()   # normalised originals of the groups with differing translations
+        self.built = True
+
+    def reset(self, origins, trans):
+        ''' Use the given dictionaries, the groups are found only when first needed (ensure_built) '''
+        self.build({}, {})
+        self.origins = origins
+        self.trans = trans
+        self.built = False
+
+    def ensure_built(self):
+        if not self.built:
+            self.build(self.origins, self.trans)
+
+    def build(self, origins, trans):
+        self.origins = origins
+        self.trans = trans
+        self.built = True
+        # grouped by the hash of the normalised original first, so only the keys are kept for the
+        # unique ones (most of them) and not the texts decoded by a lazily parsed dictionary
+        first = {}      # hash -> first key having it
+        repeated = {}   # hash -> keys having it, if more than one
+        for key, item in origins.iteritems():
+            norm = normalise(item.trans)
+            if not norm:
+                continue
+            other = first.setdefault(hash(norm), key)
+            if other is not key:
+                keys = repeated.get(hash(norm))
+                if keys is None:
+                    repeated[hash(norm)] = [other, key]
+                else:
+                    keys.append(key)
+        del first
+        groups = {}
+        for keys in repeated.itervalues():
+            # different originals may have the same hash
+            for key in keys:
+                groups.setdefault(normalise(origins[key].trans), []).append(key)
+        self.groups = dict((norm, keys) for norm, keys in groups.iteritems() if len(keys) > 1)
+        self.inconsistent = set(norm for norm in self.groups if self.check(norm))
+
+    def check(self, norm):
+        ''' :return: True if the translated keys of the group have different translations '''
+        texts = set()
+        for key in self.groups[norm]:
+            item = self.trans.get(key)
+            if item is not None and item.trans.strip():
+                texts.add(item.trans)
+                if len(texts) > 1:
+                    return True
+        return False
+
+    def update(self, key):
+        ''' Translation of key changed '''
+        if not self.built:
+            return
+        origin = self.origins.get(key)
+        if origin is None:
+            return
+        norm = normalise(origin.trans)
+        if norm in self.groups:
+            if self.check(norm):
+                self.inconsistent.add(norm)
+            else:
+                self.inconsistent.discard(norm)
+
+    def group(self, key):
+        ''' :return: the keys having the same original as key, key included; [key] if none '''
+        self.ensure_built()
+        origin = self.origins.get(key)
+        if origin is None:
+            return [key]
+        return self.groups.get(normalise(origin.trans), [key])
+
+    def inconsistent_keys(self):
+        ''' :return: keys of all the groups with differing translations '''
+        self.ensure_built()
+        return [key for norm in self.inconsistent for key in self.groups[norm]]
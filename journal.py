@@ -0,0 +1,121 @@
+# Apropy - a Java properties file editor in python.
+# Copyright (C) 2016 Andras Szell
+
+import os
+import time
+import zlib
+import struct
+import logging
+
+from prop import atomic_write
+
+logger = logging.getLogger("apropy")
+
+JOURNAL_SUFFIX = '.journal'
+MAGIC = 'APROPY-JOURNAL 1\n'
+HEADER = struct.Struct('<d')        # time the journal was started
+RECORD = struct.Struct('<Ii')       # length and crc32 of the record data
+
+class EditJournal(object):
+    '''
+    Append-only file of the translations set since the translated file was last saved, next to it,
+    to recover them after a crash. append() only queues the record, flush() writes the queued ones
+    with a single write and sync. A record is key, NUL and translation in utf-8, preceded by its
+    length and crc32; a record torn by a crash is detected and ignored when reading.
+    '''
+    def __init__(self, transfname):
+        self.fname = transfname + JOURNAL_SUFFIX
+        self.pending = []       # (key, translation) not written yet
+        self.fhnd = None
+        self.end = 0            # end of the last valid record found by read()
+
+    def append(self, key, translation):
+        self.pending.append((key, translation))
+
+    def flush(self):
+        if not self.pending:
+            return
+        records = self.pending
+        self.pending = []
+        try:
+            if self.fhnd is None:
+                self.open()
+            self.fhnd.write(encode(records))
+            self.fhnd.flush()
+            os.fsync(self.fhnd.fileno())
+        except (IOError, OSError), e:
+            # the edits are still in memory
+            logger.warn("Unable to write edit journal %s: %s" % (self.fname, e))
+            self.close()
+
+    def open(self):
+        ''' Open the journal for appending, after the last valid record of an existing one '''
+        if self.read() is None:
+            self.fhnd = open(self.fname, 'wb')
+            self.fhnd.write(MAGIC + HEADER.pack(time.time()))
+        else:
+            # records written after a torn one could not be read
+            self.fhnd = open(self.fname, 'r+b')
+            self.fhnd.seek(self.end)
+            self.fhnd.truncate()
+
+    def close(self):
+        if self.fhnd is not None:
+            try:
+                self.fhnd.close()
+            except (IOError, OSError):
+                pass
+            self.fhnd = None
+
+    def read(self):
+        ''' :return: (time the journal was started, list of (key, translation) in the order set),
+            None if there is no journal '''
+        try:
+            with open(self.fname, 'rb') as fin:
+                data = fin.read()
+        except (IOError, OSError):
+            return None
+        start = len(MAGIC) + HEADER.size
+        if not data.startswith(MAGIC) or len(data) < start:
+            logger.warn("Invalid edit journal ignored: " + self.fname)
+            return None
+        created = HEADER.unpack_from(data, len(MAGIC))[0]
+        records, self.end = decode(data, start)
+        if self.end < len(data):
+            logger.warn("Edit journal %s: %d bytes of an incomplete record ignored" % (self.fname, len(data) - self.end))
+        return created, records
+
+    def reset(self, records=()):
+        ''' Replace the journal with the given (key, translation) records, e.g. the ones still
+            unsaved after a save; the file is removed if there are none '''
+        self.close()
+        self.pending = []
+        try:
+            if records:
+                atomic_write(self.fname, MAGIC + HEADER.pack(time.time()) + encode(records))
+            elif os.path.exists(self.fname):
+                os.remove(self.fname)
+        except (IOError, OSError), e:
+            logger.warn("Unable to reset edit journal %s: %s" % (self.fname, e))
+
+def encode(records):
+    parts = []
+    for key, translation in records:
+        data = key.encode('utf-8') + '\0' + translation.encode('utf-8')
+        parts.append(RECORD.pack(len(data), zlib.crc32(data)))
+        parts.append(data)
+    return ''.join(parts)
+
+def decode(data, pos=0):
+    ''' :return: (list of (key, translation), end of the last valid record) '''
+    records = []
+    while pos + RECORD.size <= len(data):
+        length, crc = RECORD.unpack_from(data, pos)
+        start = pos + RECORD.size
+        record = data[start:start + length]
+        if len(record) < length or zlib.crc32(record) != crc:
+            break
+        key, translation = record.split('\0', 1)
+        records.append((key.decode('utf-8'), translation.decode('utf-8')))
+        pos = start + length
+    return records, pos
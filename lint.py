@@ -0,0 +1,202 @@
+# Apropy - a Java properties file editor in python.
+# Copyright (C) 2016 Andras Szell
+
+import re
+from collections import OrderedDict
+
+# {0}, {1,number}, {0,choice,...} - the argument index is what has to match
+MESSAGEFORMAT_RE = re.compile(r'\{\s*(\d+)\s*(?:,[^{}]*)?\}')
+# java.util.Formatter specifiers: %s, %1$d, %-10.2f, %%, %n (the space flag is left out, "50% of")
+PRINTF_RE = re.compile(r'%(?:(\d+)\$)?[-#+0,(]*\d*(?:\.\d+)?([bBhHsScCdoxXeEfgGaAtTn%])')
+# an apostrophe which is not doubled
+APOSTROPHE_RE = re.compile(r"(?<!')'(?!')")
+
+class Issue(object):
+    __slots__ = ('key', 'rule', 'message')
+
+    def __init__(self, key, rule, message):
+        self.key = key
+        self.rule = rule        # name of the rule, see RULES
+        self.message = message
+
+def messageformat_args(text):
+    return sorted(set(MESSAGEFORMAT_RE.findall(text))) if u'{' in text else []
+
+def printf_args(text):
+    ''' :return: sorted (argument index, conversion) pairs of the specifiers of text '''
+    if u'%' not in text:
+        return []
+    args = set()
+    implicit = 0
+    for index, conversion in PRINTF_RE.findall(text):
+        if conversion in u'%n':
+            # no argument used
+            continue
+        if not index:
+            implicit += 1
+            index = implicit
+        args.add((int(index), conversion))
+    return sorted(args)
+
+def check_messageformat(original, translation):
+    expected = messageformat_args(original)
+    found = messageformat_args(translation)
+    if expected == found:
+        return None
+    missing = [u'{%s}' % i for i in expected if i not in found]
+    extra = [u'{%s}' % i for i in found if i not in expected]
+    parts = []
+    if missing:
+        parts.append(u'missing ' + u', '.join(missing))
+    if extra:
+        parts.append(u'not in the original ' + u', '.join(extra))
+    return u'Placeholders: ' + u'; '.join(parts)
+
+def check_printf(original, translation):
+    expected = printf_args(original)
+    found = printf_args(translation)
+    if expected == found:
+        return None
+    describe = lambda args: u', '.join(u'%%%d$%s' % arg for arg in args) or u'none'
+    return u'Format specifiers: %s in the original, %s here' % (describe(expected), describe(found))
+
+def check_apostrophe(original, translation):
+    # in a MessageFormat pattern a single apostrophe starts quoted text, the rest is not formatted
+    if u"'" not in translation or u'{' not in original or not messageformat_args(original):
+        return None
+    if APOSTROPHE_RE.search(original) is None and APOSTROPHE_RE.search(translation) is not None:
+        return u"Single apostrophe in a message with placeholders, write it as ''"
+    return None
+
+def check_trailing_space(original, translation):
+    if translation[-1:].isspace() and not original[-1:].isspace():
+        return u'Trailing whitespace not in the original'
+    return None
+
+def check_leading_space(original, translation):
+    # 'key = text' leaves the space in the value (see prop.break_key), Java drops it
+    if translation[:1] == u' ' and translation.strip():
+        return u'Leading spaces, ignored by Java'
+    return None
+
+# rule name -> function returning the message of the issue of a translation, or None
+RULES = OrderedDict([
+    ('placeholder', check_messageformat),
+    ('printf', check_printf),
+    ('apostrophe', check_apostrophe),
+    ('trailing', check_trailing_space),
+    ('leading', check_leading_space),
+])
+# iterating an OrderedDict is slow, this is done for every key
+CHECKS = RULES.items()
+DUPLICATE = 'duplicate'
+RULE_NAMES = OrderedDict([
+    ('placeholder', 'MessageFormat placeholders'),
+    ('printf', 'printf format specifiers'),
+    ('apostrophe', 'Apostrophe escaping'),
+    ('trailing', 'Trailing whitespace'),
+    ('leading', 'Leading spaces'),
+    (DUPLICATE, 'Duplicate keys'),
+])
+
+class LintIndex(object):
+    '''
+    Issues of every key of a bundle found by the RULES, and the keys defined more than once in
+    the files. All the keys are checked by build(), after an edit update() checks the edited key
+    only. Keys without issues are not stored, so looking up a row is a dict lookup.
+    After reset() the keys are checked one by one as their rows are looked up (get), all of them
+    only when the whole list is needed.
+    '''
+    def __init__(self):
+        self.origins = {}
+        self.trans = {}
+        self.duplicates = {}    # file kind ('original' or 'translated') -> keys repeated in it
+        self.issues = {}        # key -> list of Issues
+        self.checked = None     # keys checked so far if not built, see reset
+
+    def reset(self, origins, trans, duplicates=None):
+        ''' Use the given dictionaries, the keys are checked only when first needed '''
+        self.build({}, {}, duplicates)
+        self.origins = origins
+        self.trans = trans
+        self.checked = set()
+
+    def ensure_built(self):
+        if self.checked is not None:
+            self.build(self.origins, self.trans, self.duplicates)
+
+    def build(self, origins, trans, duplicates=None):
+        '''
+        :param duplicates: dict of file kind -> keys defined more than once in that file
+        '''
+        self.origins = origins
+        self.trans = trans
+        self.duplicates = dict((kind, set(keys)) for kind, keys in (duplicates or {}).iteritems() if keys)
+        self.checked = None
+        issues = {}
+        check = self.check
+        for key, item in trans.iteritems():
+            found = check(key, item)
+            if found:
+                issues[key] = found
+        for keys in self.duplicates.itervalues():
+            for key in keys:
+                if key not in issues:
+                    found = check(key, trans.get(key))
+                    if found:
+                        issues[key] = found
+        self.issues = issues
+
+    def check(self, key, item):
+        ''' :return: list of the Issues of key, item being its translation '''
+        found = []
+        origin = self.origins.get(key)
+        if item is not None and origin is not None:
+            translation = item.trans
+            if translation.strip():
+                original = origin.trans
+                for rule, function in CHECKS:
+                    message = function(original, translation)
+                    if message is not None:
+                        found.append(Issue(key, rule, message))
+        for kind, keys in self.duplicates.iteritems():
+            if key in keys:
+                found.append(Issue(key, DUPLICATE, u'Defined more than once in the %s file' % kind))
+        return found
+
+    def update(self, key):
+        ''' Translation of key changed
+        :return: True if its issues changed '''
+        old = self.issues.pop(key, [])
+        found = self.check(key, self.trans.get(key))
+        if found:
+            self.issues[key] = found
+        if self.checked is not None:
+            self.checked.add(key)
+        return [(i.rule, i.message) for i in old] != [(i.rule, i.message) for i in found]
+
+    def set_duplicates(self, kind, keys):
+        ''' Keys repeated in a file changed, e.g. it was saved or read again
+        :return: the keys whose issues changed '''
+        old = self.duplicates.pop(kind, set())
+        if keys:
+            self.duplicates[kind] = set(keys)
+        return [key for key in old.symmetric_difference(keys) if self.update(key)]
+
+    def get(self, key):
+        ''' :return: list of the Issues of key, empty if it has none '''
+        if self.checked is not None and key not in self.checked:
+            self.update(key)
+        return self.issues.get(key, [])
+
+    def messages(self, key):
+        return [issue.message for issue in self.get(key)]
+
+    def list(self, rule=None):
+        ''' :return: Issues of the given rule (all if None) in the order of the original file,
+            followed by the ones of keys missing from it '''
+        self.ensure_built()
+        keys = [k for k in self.origins if k in self.issues]
+        if len(keys) < len(self.issues):
+            keys.extend(sorted(k for k in self.issues if k not in self.origins))
+        return [issue for key in keys for issue in self.issues[key] if rule is None or issue.rule == rule]
@@ -0,0 +1,271 @@
+# Apropy - a Java properties file editor in python.
+# Copyright (C) 2016 Andras Szell
+
+import os
+import zlib
+import errno
+import struct
+import marshal
+import logging
+from array import array
+from itertools import izip
+
+from prop import atomic_write
+
+logger = logging.getLogger("apropy")
+
+BASE_SUFFIX = '.base'
+MAGIC = 'APROPY-BASE 2\n'
+HEADER = struct.Struct('<I')        # length of the marshalled snapshot
+RECORD = struct.Struct('<Ii')       # length and crc32 of an appended record
+COMPACT_RECORDS = 1000              # appended records always kept, see needs_rewrite
+
+def text_hash(text):
+    # signed, as stored in the array
+    return zlib.crc32(text.encode('utf-8'))
+
+class BaseSnapshot(object):
+    '''
+    Originals the translations were made from, kept in a sidecar next to the translated file:
+    a hash of the original of every translated key, and the originals themselves compressed.
+    A translated key is outdated if its original has changed since its translation was saved.
+    The sidecar is a full snapshot followed by records appended by record(), one for each key
+    whose original was recorded (or forgotten) since, so a save writes only the keys it saved.
+    The compressed texts are only decompressed if there are outdated keys, to show what their
+    originals were. The sidecar is only written when saving: appended to by record(), or written
+    in full by write() if needs_rewrite().
+    '''
+    def __init__(self):
+        self.load(None)
+
+    def load(self, transfname):
+        ''' Read the sidecar of a translated file, no keys are recorded if there is none '''
+        self.fname = transfname + BASE_SUFFIX if transfname else None
+        self.hashes = {}        # key -> hash of the original its translation was saved with
+        self.keys = []          # keys of the packed originals, in order
+        self.packed = None      # zlib compressed, marshalled list of the originals of the snapshot
+        self.texts = {}         # key -> original recorded since the snapshot, None if forgotten
+        self.appended = 0       # number of records after the snapshot
+        self.end = 0            # end of the last valid record
+        self.outdated = set()   # translated keys whose original changed since
+        self.old = {}           # key -> recorded original, for the outdated keys
+        if self.fname is None:
+            return
+        try:
+            with open(self.fname, 'rb') as fin:
+                data = fin.read()
+            if not data.startswith(MAGIC):
+                raise ValueError("unknown format")
+            start = len(MAGIC) + HEADER.size
+            end = start + HEADER.unpack_from(data, len(MAGIC))[0]
+            payload = marshal.loads(data[start:end])
+            hashes = array('i')
+            hashes.fromstring(payload['hashes'])
+            if len(hashes) != len(payload['keys']):
+                raise ValueError("%d hashes of %d keys" % (len(hashes), len(payload['keys'])))
+        except (IOError, OSError), e:
+            if e.errno != errno.ENOENT:
+                logger.warn("Unable to read base snapshot %s: %s" % (self.fname, e))
+            return
+        except (struct.error, EOFError, ValueError, TypeError, KeyError), e:
+            logger.warn("Invalid base snapshot %s ignored: %s" % (self.fname, e))
+            return
+        self.keys = payload['keys']
+        self.hashes = dict(izip(self.keys, hashes))
+        self.packed = payload['texts']
+
+        records, self.end = decode(data, end)
+        if self.end < len(data):
+            logger.warn("Base snapshot %s: %d bytes of an incomplete record ignored" % (self.fname, len(data) - self.end))
+        self.apply(records)
+
+    def apply(self, records):
+        ''' Take (key, hash, original) records, hash and original are None for a key forgotten '''
+        for key, recorded, text in records:
+            if recorded is None:
+                self.hashes.pop(key, None)
+            else:
+                self.hashes[key] = recorded
+            self.texts[key] = text
+        self.appended += len(records)
+
+    def unpack(self, keys):
+        ''' :return: dict of key -> recorded original of the given keys '''
+        if not keys:
+            return {}
+        found = {}
+        if self.packed is not None:
+            texts = marshal.loads(zlib.decompress(self.packed))
+            found = dict((key, text) for key, text in izip(self.keys, texts) if key in keys)
+        for key in keys:
+            if key in self.texts:
+                found[key] = self.texts[key]
+        return dict((key, text) for key, text in found.iteritems() if text is not None)
+
+    def is_outdated(self, key, origins, trans):
+        recorded = self.hashes.get(key)
+        if recorded is None or key not in trans:
+            return False
+        origin = origins.get(key)
+        return origin is not None and text_hash(origin.trans) != recorded
+
+    def compare(self, origins, trans):
+        ''' Find the outdated keys in one pass over the originals, decoded in batches if they are
+            loaded lazily
+        :return: keys whose outdated state changed '''
+        # the hash is inlined, this is done for every key
+        crc32 = zlib.crc32
+        recorded_hash = self.hashes.get
+        outdated = set()
+        for key, origin in origins.iteritems():
+            recorded = recorded_hash(key)
+            if recorded is not None and key in trans and crc32(origin.trans.encode('utf-8')) != recorded:
+                outdated.add(key)
+        changed = outdated.symmetric_difference(self.outdated)
+        self.outdated = outdated
+        self.old = self.unpack(outdated)
+        return changed
+
+    def update(self, key, origins, trans):
+        ''' Translation of key changed (e.g. removed, or added again by an undo)
+        :return: True if its outdated state changed '''
+        outdated = self.is_outdated(key, origins, trans)
+        if outdated == (key in self.outdated):
+            return False
+        if outdated:
+            self.outdated.add(key)
+            if key not in self.old:
+                self.old.update(self.unpack([key]))
+        else:
+            # the text is kept for an undo
+            self.outdated.discard(key)
+        return True
+
+    def record(self, keys, origins, trans):
+        ''' The translations of keys were saved or reviewed, so they are made from the current
+            originals; a record is appended to the sidecar for each key whose original changed
+        :return: keys which are not outdated anymore '''
+        records = []
+        for key in keys:
+            origin = origins.get(key)
+            if key in trans and origin is not None:
+                text = origin.trans
+                recorded = text_hash(text)
+            else:
+                text = recorded = None
+            if self.hashes.get(key) != recorded:
+                records.append((key, recorded, text))
+        self.apply(records)
+        self.append(records)
+
+        changed = [key for key in keys if key in self.outdated]
+        self.outdated.difference_update(changed)
+        for key in changed:
+            self.old.pop(key, None)
+        return changed
+
+    def append(self, records):
+        ''' Write records after the last valid one, with a single write and sync '''
+        if self.fname is None or not records:
+            return
+        try:
+            if self.end == 0 or not os.path.exists(self.fname):
+                # none yet, an empty snapshot to append to
+                atomic_write(self.fname, pack([], array('i'), None))
+                self.end = os.path.getsize(self.fname)
+            with open(self.fname, 'r+b') as fout:
+                # records written after a torn one could not be read
+                fout.seek(self.end)
+                fout.truncate()
+                fout.write(encode(records))
+                fout.flush()
+                os.fsync(fout.fileno())
+                self.end = fout.tell()
+        except (IOError, OSError), e:
+            # the keys are recorded again when saved next time
+            logger.warn("Unable to append to base snapshot %s: %s" % (self.fname, e))
+
+    def needs_rewrite(self):
+        ''' :return: True if there is no sidecar yet, or more records have been appended to it
+            than a quarter of its keys '''
+        return self.fname is not None and (self.end == 0 or self.appended > max(COMPACT_RECORDS, len(self.hashes) // 4))
+
+    def write(self, origins, trans):
+        ''' Write the sidecar in full, with the originals of all the translated keys; the ones
+            not recorded yet are taken as made from the current original. compare() must have
+            found the outdated keys. Costs a pass over all the keys, meant for a background thread. '''
+        if self.fname is None:
+            return
+        outdated = self.outdated
+        recorded_hash = self.hashes.get
+        keys = []
+        hashes = array('i')
+        texts = []
+        for key, origin in origins.iteritems():
+            if key not in trans:
+                continue
+            if key in outdated:
+                text = self.old.get(key)
+                recorded = self.hashes[key]
+            else:
+                text = origin.trans
+                recorded = recorded_hash(key)
+                if recorded is None:
+                    recorded = text_hash(text)
+            keys.append(key)
+            hashes.append(recorded)
+            texts.append(text)
+        self.keys = keys
+        self.hashes = dict(izip(keys, hashes))
+        self.packed = zlib.compress(marshal.dumps(texts), 1)
+        self.texts = {}
+        self.appended = 0
+        try:
+            data = pack(keys, hashes, self.packed)
+            atomic_write(self.fname, data)
+            self.end = len(data)
+        except (IOError, OSError), e:
+            # outdated keys are found again next time, the others are not recorded
+            logger.warn("Unable to write base snapshot %s: %s" % (self.fname, e))
+            self.end = 0
+
+def load_base(transfname, origins, trans):
+    '''
+    Read the sidecar of a translated file and find its outdated keys, nothing is written.
+    Costs a pass over all the keys, meant for a background thread.
+    :return: the BaseSnapshot
+    '''
+    base = BaseSnapshot()
+    base.load(transfname)
+    base.compare(origins, trans)
+    return base
+
+def pack(keys, hashes, packed):
+    ''' :return: contents of a sidecar of the given snapshot, without appended records '''
+    payload = marshal.dumps({'keys': keys, 'hashes': hashes.tostring(),
+                             'texts': packed if packed is not None else zlib.compress(marshal.dumps([]))})
+    return MAGIC + HEADER.pack(len(payload)) + payload
+
+def encode(records):
+    parts = []
+    for record in records:
+        data = marshal.dumps(record)
+        parts.append(RECORD.pack(len(data), zlib.crc32(data)))
+        parts.append(data)
+    return ''.join(parts)
+
+def decode(data, pos):
+    ''' :return: (list of (key, hash, original) records, end of the last valid one) '''
+    records = []
+    while pos + RECORD.size <= len(data):
+        length, crc = RECORD.unpack_from(data, pos)
+        start = pos + RECORD.size
+        record = data[start:start + length]
+        if len(record) < length or zlib.crc32(record) != crc:
+            break
+        try:
+            records.append(marshal.loads(record))
+        except (EOFError, ValueError, TypeError):
+            break
+        pos = start + length
+    return records, pos
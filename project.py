@@ -0,0 +1,127 @@
+# Apropy - a Java properties file editor in python.
+# Copyright (C) 2016 Andras Szell
+
+import os
+import marshal
+import logging
+import multiprocessing
+from itertools import imap
+from cStringIO import StringIO
+from collections import OrderedDict
+
+from prop import propread, PropSpans
+from cache import ParseCache, pack, unpack
+
+logger = logging.getLogger("apropy")
+
+class Project(object):
+    '''
+    Translations of one base file to all the locales found next to it, e.g. msg_bundle_de.properties
+    and msg_bundle_hu.properties for msg_bundle.properties.
+    Keys and comments of the base file and of every locale are interned in one table, so the
+    dictionaries share the strings and a locale costs the memory of its translation texts only.
+    '''
+    def __init__(self, basefname):
+        self.basefname = basefname
+        self.locales = find_locales(basefname)  # locale name -> file name
+        self.strings = {}       # interning table of keys and comments
+        self.trans = {}         # locale name -> items of the loaded locales
+        self.spans = {}         # locale name -> PropSpans of the file
+        self.stats = {}         # locale name -> file_stat taken when the file was read
+        self.duplicates = {}    # locale name -> keys defined more than once in the file
+
+    def locale_of(self, fname):
+        ''' :return: name of the locale stored in fname, None if it is not part of the project '''
+        path = os.path.normcase(os.path.abspath(fname))
+        for name, locale_fname in self.locales.iteritems():
+            if os.path.normcase(os.path.abspath(locale_fname)) == path:
+                return name
+        return None
+
+    def parse(self, names, cache=None, processes=None):
+        '''
+        Parse the files of the given locales in worker processes (one per processor by default).
+        Generates (name, items, spans, error) in the order of names, each as soon as its file is
+        parsed, so the first locales can be used while the others are still being parsed.
+        '''
+        args = [(self.locales[name], cache.dirname if cache else None, cache.max_size if cache else 0)
+                for name in names]
+        if processes is None:
+            try:
+                processes = multiprocessing.cpu_count()
+            except NotImplementedError:
+                processes = 1
+        pool = None
+        if len(args) > 1 and processes > 1:
+            try:
+                pool = multiprocessing.Pool(processes)
+            except (OSError, ImportError), e:
+                logger.warn("Parsing locales in this process only: %s" % e)
+
+        try:
+            results = pool.imap(parse_packed, args) if pool is not None else imap(parse_packed, args)
+            for name in names:
+                try:
+                    data, error = results.next()
+                except Exception, e:
+                    data, error = None, e
+                if error is not None:
+                    yield name, None, None, error
+                    continue
+                items, spans, self.duplicates[name] = unpack(marshal.loads(data), self.strings)
+                yield name, items, spans or PropSpans(), None
+        finally:
+            if pool is not None:
+                # also stops the workers when the generator is closed early
+                pool.terminate()
+                pool.join()
+
+def find_locales(basefname):
+    ''' :return: OrderedDict of locale name -> file name of the translations of basefname next to it '''
+    dirname, basename = os.path.split(basefname)
+    root, ext = os.path.splitext(basename)
+    prefix = root + '_'
+    locales = {}
+    try:
+        names = os.listdir(dirname or '.')
+    except OSError:
+        names = []
+    for name in names:
+        if name.startswith(prefix) and name.endswith(ext) and len(name) > len(prefix) + len(ext):
+            locales[name[len(prefix):len(name) - len(ext)]] = os.path.join(dirname, name)
+    return OrderedDict(sorted(locales.items()))
+
+def find_base(fname):
+    ''' :return: the base file of a translated file, e.g. msg_bundle.properties for
+        msg_bundle_pt_BR.properties, or None if there is none '''
+    root, ext = os.path.splitext(fname)
+    while '_' in os.path.basename(root):
+        root = root.rsplit('_', 1)[0]
+        if os.path.isfile(root + ext):
+            return root + ext
+    return None
+
+def parse_packed(args):
+    '''
+    Parse a translated file, runs in a worker process.
+    :param args: (file name, parse cache directory or None, parse cache size)
+    :return: (marshalled cache.pack result, None) or (None, exception)
+    '''
+    fname, cache_dir, cache_size = args
+    try:
+        cache = ParseCache(cache_dir, cache_size) if cache_dir else None
+        payload = cache.read(fname, 'trans') if cache is not None else None
+        if payload is None:
+            spans = PropSpans()
+            duplicates = []
+            with open(fname, 'rb') as fin:
+                st = os.fstat(fin.fileno())
+                data = fin.read()
+            items = propread(StringIO(data), spans, duplicates)
+            if cache is not None:
+                cache.store(fname, items, spans, 'trans', data, st, duplicates)
+            payload = pack(items, spans, duplicates)
+        # a string is sent back to the main process much faster than the items themselves
+        return marshal.dumps(payload), None
+    except Exception, e:
+        return None, e
@@ -1,8 +1,130 @@
+import os
 import re
+import mmap
+import codecs
+import shutil
+import tempfile
+from array import array
 from collections import OrderedDict
-from namedlist import namedlist
 
-TransItem = namedlist('TransItem', 'key, comment, trans', default='')
+try:
+    import ctypes
+    MoveFileEx = ctypes.windll.kernel32.MoveFileExW
+except (ImportError, AttributeError):
+    # not on Windows, or ctypes left out of the frozen build
+    MoveFileEx = None
+
+MOVEFILE_REPLACE_EXISTING = 0x1
+MOVEFILE_WRITE_THROUGH = 0x8
+
+class TransItem(object):
+    ''' Key, comments and translation of an entry. The fields can be set, items compare equal
+        by value. Slots only, no dict per item: a bundle has hundreds of thousands of them. '''
+    __slots__ = ('key', 'comment', 'trans')
+
+    def __init__(self, key='', comment='', trans=''):
+        self.key = key
+        self.comment = comment
+        self.trans = trans
+
+    def __eq__(self, other):
+        if not isinstance(other, TransItem):
+            return NotImplemented
+        return self.trans == other.trans and self.key == other.key and self.comment == other.comment
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    # mutable
+    __hash__ = None
+
+    def __repr__(self):
+        return 'TransItem(key=%r, comment=%r, trans=%r)' % (self.key, self.comment, self.trans)
+
+class PropSpans(object):
+    ''' Byte offsets of the items of a properties file: key -> (comment start, entry start, entry end).
+        Offsets are stored in arrays in file order so moving them after an edit is cheap,
+        removed items stay in the arrays as empty ranges. '''
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.index = {}     # key -> position in the arrays
+        self.cstarts = array('l')
+        self.vstarts = array('l')
+        self.ends = array('l')
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __getitem__(self, key):
+        i = self.index[key]
+        return self.cstarts[i], self.vstarts[i], self.ends[i]
+
+    def copy(self):
+        spans = PropSpans()
+        spans.index = dict(self.index)
+        spans.cstarts = array('l', self.cstarts)
+        spans.vstarts = array('l', self.vstarts)
+        spans.ends = array('l', self.ends)
+        return spans
+
+    def add(self, key, cstart, vstart, end):
+        self.index[key] = len(self.ends)
+        self.cstarts.append(cstart)
+        self.vstarts.append(vstart)
+        self.ends.append(end)
+
+    def remove(self, key):
+        ''' Forget key, its range is emptied by the following shift() calls of proppatch '''
+        i = self.index.pop(key)
+        self.vstarts[i] = self.ends[i] = self.cstarts[i]
+
+    def tail(self):
+        ''' End of the last item '''
+        return self.ends[-1] if self.ends else 0
+
+    def shift(self, lo, hi, delta):
+        ''' Move the items lo..hi-1 by delta bytes '''
+        if delta and lo < hi:
+            for arr in (self.cstarts, self.vstarts, self.ends):
+                arr[lo:hi] = array('l', [x + delta for x in arr[lo:hi]])
+
+    def items(self):
+        ''' (key, offsets) pairs in file order '''
+        keys = sorted(self.index, key=self.index.get)
+        return [(key, self[key]) for key in keys]
+
+UNICODE_ESCAPE_RE = re.compile(r'\\u([0-9a-fA-F]{4})')
+ESCAPED_NEWLINE_RE = re.compile(r'\\u000[aA]')
+
+class EscapeTable(dict):
+    ''' Hex code -> character lookup, filled up on first use of each code '''
+    def __missing__(self, code):
+        self[code] = ch = unichr(int(code, 16))
+        return ch
+
+ESCAPES = EscapeTable()
+
+class UnescapeTable(dict):
+    ''' Character -> \\uXXXX escape lookup, filled up on first use of each character '''
+    def __missing__(self, ch):
+        self[ch] = esc = u'\\u%04x' % ord(ch)
+        return esc
+
+UNESCAPES = UnescapeTable()
+
+def escape_errors(err):
+    ''' Codec error handler replacing each run of non latin-1 characters with \\uXXXX escapes '''
+    run = err.object[err.start:err.end]
+    return u''.join(map(UNESCAPES.__getitem__, run)), err.end
+
+codecs.register_error('propescape', escape_errors)
 
 def unidecode(stre):
     stnew = stre.group(0).decode('unicode-escape')
@@ -17,7 +139,36 @@ def to_unicode(st):
     rest = re.sub(r'\\u[0-9a-fA-F]{4}', unidecode, st)
     return rest
 
+def unescape(ust):
+    ''' Convert all \\uXXXX escapes of a unicode string at once (no callback per escape) '''
+    parts = UNICODE_ESCAPE_RE.split(ust)
+    if len(parts) == 1:
+        return ust
+    # every odd element is the hex code of an escape
+    parts[1::2] = map(ESCAPES.__getitem__, parts[1::2])
+    return u''.join(parts)
+
+def decode_lines(data):
+    ''' Decode a whole latin-1 file buffer and return its lines (without line ends) '''
+    text = data.decode('latin-1')
+    if ESCAPED_NEWLINE_RE.search(text) is None:
+        lines = remove_wrong_spaces(unescape(text)).split(u'\n')
+    else:
+        # an escaped line break must not split the line it is in, go line by line
+        lines = [remove_wrong_spaces(unescape(l)) for l in text.split(u'\n')]
+
+    # a buffer ending with a line break has no extra empty line after it
+    if lines[-1] == u'':
+        lines.pop()
+    return lines
+
 def from_unicode(ust):
+    ''' Encode to latin-1, escaping everything else as \\uXXXX. Latin-1 runs are encoded by the
+        codec, the error handler is called only once per run of other characters. '''
+    return ust.encode('iso-8859-1', 'propescape')
+
+def from_unicode_charwise(ust):
+    ''' The original character by character encoder, kept as a reference for from_unicode '''
     st = ''
     for uch in ust:
         res =  uch.encode('iso-8859-1', "xmlcharrefreplace")
@@ -55,9 +206,236 @@ def remove_wrong_spaces(st):
     newst = newst.replace("\x00", " ")
     return newst
 
-def propread(fhnd):
+def propread(fhnd, spans=None, duplicates=None, strings=None):
     ''' Return an ordered dictionary with key, comments, translation pairs.
-        Properly process multiline comments and translations, and parse unicode strings '''
+        Properly process multiline comments and translations, and parse unicode strings.
+        If a PropSpans object is given, the file must be opened in binary mode, see propparse. '''
+    data = fhnd.read()
+    if '\r' in data:
+        # universal newlines by hand, byte offsets would not match the file any more
+        data = data.replace('\r\n', '\n').replace('\r', '\n')
+        spans = None
+    return propparse(data, spans, duplicates=duplicates, strings=strings)
+
+def line_offsets(data):
+    ''' Start offset of every line of data, closed with the buffer length '''
+    offsets = []
+    pos = 0
+    for raw in data.split('\n'):
+        offsets.append(pos)
+        pos += len(raw) + 1
+    offsets.append(len(data))
+    return offsets
+
+def propparse(data, spans=None, keep_duplicates=False, duplicates=None, strings=None):
+    ''' Same as propread, but works on the file contents (str with \\n line ends).
+        The buffer is decoded in one go, then every line is classified only once.
+
+        If a PropSpans object is given, it is filled with the byte offsets of every item,
+        see proppatch. Duplicate keys make the offsets ambiguous, spans is left empty for such files
+        unless keep_duplicates is set (then every occurrence is in the arrays, the last one indexed).
+        Keys found again are appended to the duplicates list if one is given, the value of the
+        last occurrence is kept at the place of the first.
+        strings is a dict to intern keys and comments with: files parsed with the same table share
+        their equal keys and comments, e.g. the original and the translated file. '''
+    tdict = OrderedDict()
+
+    comment = []    # comment lines collected for the next item
+    key = None      # key of the multiline item being read, None outside multiline values
+    value = None    # value parts of the multiline item
+
+    offsets = line_offsets(data) if spans is not None else None
+    cstart = 0      # comment of the next item starts after the end of the previous one
+    repeated = False
+
+    for i, l in enumerate(decode_lines(data)):
+        stripped = l.strip()
+        multiline = stripped and l.rstrip(u'\n')[-1] == u'\\'
+
+        if key is not None:
+            if multiline:
+                value.append(l)
+                value.append(u'\n')
+                continue
+            value.append(l.rstrip(u'\n'))
+            k, v = key, u''.join(value)
+            key = None
+        elif not stripped or stripped[0] == u'#':
+            comment.append(l)
+            continue
+        elif u'=' in l:
+            k, v = l.split(u'=', 1)
+            k = k.strip()
+            v = v.rstrip(u'\n')
+            itemcomment = u'\n'.join(comment) + u'\n' if comment else u''
+            comment = []
+            vstart = i
+            if multiline:
+                key = k
+                value = [v, u'\n']
+                continue
+        else:
+            continue
+
+        # item complete
+        if strings is not None:
+            k = strings.setdefault(k, k)
+            itemcomment = strings.setdefault(itemcomment, itemcomment)
+        if duplicates is not None and k in tdict:
+            duplicates.append(k)
+        if offsets is not None:
+            repeated = repeated or k in tdict
+            end = offsets[i + 1]
+            spans.add(k, cstart, offsets[vstart], end)
+            cstart = end
+        tdict[k] = TransItem(k, itemcomment, v)
+
+    if repeated and not keep_duplicates:
+        spans.clear()
+
+    return tdict
+
+def propparse_chunks(data, chunk_size=1 << 22, duplicates=None, strings=None):
+    ''' Parse data (a str or an mmap) the same way as propparse, in chunks of about chunk_size bytes,
+        each one starting at the end of the last complete item of the previous one.
+        Yields (offset of the chunk, items of the chunk, PropSpans of the items relative to the offset).
+        Keys may be repeated in later chunks, only the ones repeated within a chunk are added to
+        duplicates. '''
+    pos = 0
+    size = len(data)
+    while pos < size:
+        end = min(pos + chunk_size, size)
+        if end < size:
+            end = data.find('\n', end)
+            end = size if end == -1 else end + 1
+
+        chunk = PropSpans()
+        found = [] if duplicates is not None else None
+        items = propparse(data[pos:end], chunk, keep_duplicates=True, duplicates=found, strings=strings)
+        if not items:
+            if end == size:
+                # only comments after the last item
+                break
+            # a value or comment longer than a chunk
+            chunk_size *= 2
+            continue
+
+        if found:
+            duplicates.extend(found)
+        yield pos, items, chunk
+        if end == size:
+            break
+        pos += chunk.tail()
+
+def propindex(data, spans, chunk_size=1 << 22):
+    ''' Fill spans with the offsets of every item of data the same way as propparse, without
+        keeping the items, see propparse_chunks.
+        :return: False if there are duplicate keys, spans is left empty then '''
+    spans.clear()
+    for pos, items, chunk in propparse_chunks(data, chunk_size):
+        if len(chunk.ends) != len(items):
+            spans.clear()
+            return False
+        for key in items:
+            if key in spans:
+                spans.clear()
+                return False
+            i = chunk.index[key]
+            spans.add(key, pos + chunk.cstarts[i], pos + chunk.vstarts[i], pos + chunk.ends[i])
+    return True
+
+class LazyPropDict(OrderedDict):
+    ''' Ordered dictionary of TransItems, where the items of a file are parsed only when accessed.
+        Items not set since loading are stored as None and decoded from data using spans
+        (see propindex), the last decoded ones are cached. '''
+    CACHE_SIZE = 2000
+    BATCH = 1000
+
+    def __init__(self, data, spans, fix=None):
+        ''' :param fix: called with every item decoded, may modify it '''
+        OrderedDict.__init__(self)
+        self.data = data
+        self.spans = spans
+        self.fix = fix
+        self.cache = {}
+        for key, offsets in spans.items():
+            OrderedDict.__setitem__(self, key, None)
+
+    def __getitem__(self, key):
+        item = OrderedDict.__getitem__(self, key)
+        if item is None:
+            item = self.cache.get(key)
+            if item is None:
+                item = self.decode(self.spans[key])[key]
+                if len(self.cache) >= self.CACHE_SIZE:
+                    self.cache.clear()
+                self.cache[key] = item
+        return item
+
+    def decode(self, offsets):
+        ''' :return: the items in the given range of data, see LazyPropDict.__init__ '''
+        cstart, vstart, end = offsets
+        items = propparse(self.data[cstart:end])
+        if self.fix is not None:
+            for item in items.itervalues():
+                self.fix(item)
+        return items
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def copy(self):
+        return OrderedDict(self.iteritems())
+
+    def iteritems(self):
+        ''' Decodes the items in batches, without caching them '''
+        keys = self.keys()
+        for i in range(0, len(keys), self.BATCH):
+            batch = keys[i:i + self.BATCH]
+            lazy = [key for key in batch if OrderedDict.__getitem__(self, key) is None]
+            if lazy:
+                offsets = [self.spans[key] for key in lazy]
+                start = min(cstart for cstart, vstart, end in offsets)
+                decoded = self.decode((start, None, max(end for cstart, vstart, end in offsets)))
+            for key in batch:
+                item = OrderedDict.__getitem__(self, key)
+                yield key, item if item is not None else decoded[key]
+
+    def itervalues(self):
+        for key, item in self.iteritems():
+            yield item
+
+    def items(self):
+        return list(self.iteritems())
+
+    def values(self):
+        return list(self.itervalues())
+
+def propmap(fname, spans=None, mapped=True, fix=None):
+    ''' Like propread, but the items are parsed only when accessed, see LazyPropDict.
+        The file is memory-mapped, or read into memory if mapped is False (a mapped file can not be
+        replaced on Windows). Files the offsets can not describe (\\r line ends, duplicate keys)
+        are read by propread, fix is applied to all their items then. '''
+    with open(fname, 'rb') as fhnd:
+        if mapped and os.fstat(fhnd.fileno()).st_size > 0:
+            data = mmap.mmap(fhnd.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = fhnd.read()
+
+    own = spans if spans is not None else PropSpans()
+    if data.find('\r') != -1 or not propindex(data, own):
+        with open(fname, 'rb') as fhnd:
+            items = propread(fhnd, spans)
+        if fix is not None:
+            for item in items.itervalues():
+                fix(item)
+        return items
+
+    # spans of the caller will follow the changes of the file, the dictionary needs the original
+    return LazyPropDict(data, own.copy() if spans is not None else own, fix)
+
+def propread_linewise(fhnd):
+    ''' The original line by line reader, kept as a reference for propread '''
     COMMENTS = 0
     MULTILINE = 1
     
@@ -91,19 +469,227 @@ def propread(fhnd):
 
     return tdict
     
+def propserialize(items, spans=None, pos=0):
+    ''' Return the file contents for a sequence of TransItems, encoded in one go.
+        If a PropSpans object is given, it is filled the same way as by propparse
+        (items are encoded one by one then, to know their lengths). pos is the file offset of
+        the first item, for serializing a file in parts. '''
+    parts = []
+    if spans is None:
+        for item in items:
+            parts.extend((item.comment, item.key, u'=', item.trans, u'\n'))
+        return from_unicode(u''.join(parts))
+
+    for item in items:
+        comment = from_unicode(item.comment)
+        entry = from_unicode(u''.join((item.key, u'=', item.trans, u'\n')))
+        vstart = pos + len(comment)
+        pos = vstart + len(entry)
+        spans.add(item.key, vstart - len(comment), vstart, pos)
+        parts.append(comment)
+        parts.append(entry)
+    return ''.join(parts)
+
+def replace_file(src, dst):
+    ''' os.rename, overwriting dst on Windows too '''
+    if os.name != 'nt':
+        os.rename(src, dst)
+    elif MoveFileEx is not None:
+        if not MoveFileEx(unicode(src), unicode(dst), MOVEFILE_REPLACE_EXISTING | MOVEFILE_WRITE_THROUGH):
+            raise ctypes.WinError()
+    else:
+        # not atomic, but src is complete and synced already
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+def atomic_write(fname, data):
+    ''' Write data through a synced temporary file renamed over fname, so a crash or a failed
+        write leaves either the old or the new contents, never a truncated file '''
+    dirname = os.path.dirname(os.path.abspath(fname))
+    fd, tmpname = tempfile.mkstemp(prefix=os.path.basename(fname) + '.', suffix='.tmp', dir=dirname)
+    try:
+        with os.fdopen(fd, 'wb') as fout:
+            fout.write(data)
+            fout.flush()
+            os.fsync(fout.fileno())
+        if os.path.exists(fname):
+            shutil.copymode(fname, tmpname)
+        replace_file(tmpname, fname)
+    except:
+        if os.path.exists(tmpname):
+            os.remove(tmpname)
+        raise
+
+    if os.name != 'nt':
+        # make the rename itself durable
+        dirfd = os.open(dirname, os.O_RDONLY)
+        try:
+            os.fsync(dirfd)
+        finally:
+            os.close(dirfd)
+
+def propreorder(propdict, keys):
+    ''' :return: the items of propdict in the order of keys, the ones not in keys (obsolete) dropped '''
+    return OrderedDict((k, propdict[k]) for k in keys if k in propdict)
+
+def reorder_keys(propdict, keys):
+    ''' Put the entries of the OrderedDict propdict (all of them) in the order of keys, keeping the
+        values stored, e.g. the items a LazyPropDict has not decoded yet '''
+    values = [(key, OrderedDict.__getitem__(propdict, key)) for key in keys]
+    OrderedDict.clear(propdict)
+    for key, value in values:
+        OrderedDict.__setitem__(propdict, key, value)
+
 def propsave(fhnd, propdict):
-    cnt = 0
-    for key, item in propdict.items():
-        fhnd.write(item.comment)
-        outstr = item.key + '=' + item.trans
-        fhnd.write(from_unicode(outstr) + '\n')
-        cnt += 1
-    return cnt
+    fhnd.write(propserialize(propdict.itervalues()))
+    return len(propdict)
+
+def proppatch(data, spans, propdict, keys):
+    ''' Return data (contents of a file written from propdict earlier) with only the entries of
+        the given keys brought up to date: changed entries are rewritten in place keeping their
+        comments, removed ones are cut out together with their comments and new ones are added
+        after the last entry (at the end if there is none) in the order of keys, see keys_in_order.
+        All other bytes are kept as they were.
+        spans must describe data (see propparse) and is updated to describe the new contents. '''
+    count = len(spans.ends)
+    tail = spans.tail() if count else len(data)
+
+    edits = []      # (start, end, replacement, item index, new entry length or None if removed)
+    added = []
+    for key in keys:
+        if key in spans:
+            i = spans.index[key]
+            if key in propdict:
+                item = propdict[key]
+                entry = from_unicode(u''.join((item.key, u'=', item.trans, u'\n')))
+                edits.append((spans.vstarts[i], spans.ends[i], entry, i, len(entry)))
+            else:
+                edits.append((spans.cstarts[i], spans.ends[i], '', i, None))
+                spans.remove(key)
+        elif key in propdict:
+            added.append(propdict[key])
+
+    if added:
+        # a last line without line end gets one before the new items
+        lastedited = any(i == count - 1 for start, end, repl, i, length in edits)
+        newline = tail > 0 and data[tail - 1:tail] != '\n' and not lastedited
+        newspans = PropSpans()
+        block = propserialize(added, newspans)
+        edits.append((tail, tail, '\n' + block if newline else block, count, None))
+
+    if not edits:
+        return data
+
+    edits.sort()
+    pieces = []
+    pos = 0
+    delta = 0       # total length change of the edits so far
+    lo = 0          # first item not moved yet
+    for start, end, repl, i, length in edits:
+        pieces.append(data[pos:start])
+        pieces.append(repl)
+        pos = end
+
+        spans.shift(lo, i, delta)
+        if i < count:
+            spans.cstarts[i] += delta
+            spans.vstarts[i] += delta
+            spans.ends[i] = spans.vstarts[i] + length if length is not None else spans.cstarts[i]
+        else:
+            # the new items, after the line end added to the last one if needed
+            offset = start + delta
+            if newline:
+                if count:
+                    spans.ends[count - 1] += 1
+                offset += 1
+        delta += len(repl) - (end - start)
+        lo = i + 1
+    pieces.append(data[pos:])
+    spans.shift(lo, count, delta)
+
+    if added:
+        for key, (cstart, vstart, end) in newspans.items():
+            spans.add(key, cstart + offset, vstart + offset, end + offset)
+
+    return ''.join(pieces)
+
+def keys_in_order(propdict, keys):
+    ''' :return: keys sorted by their position in the OrderedDict propdict, keys not in it first.
+        propdict is scanned from its end, where the keys added lately are, until all are found. '''
+    missing = [key for key in keys if key not in propdict]
+    wanted = set(keys).difference(missing)
+    found = []
+    if wanted:
+        for key in reversed(propdict):
+            if key in wanted:
+                found.append(key)
+                if len(found) == len(wanted):
+                    break
+    found.reverse()
+    return missing + found
+
+def benchmark_read(fname, repeat=3):
+    ''' Time propread against the line by line reader on the same file '''
+    import time
+
+    results = {}
+    for reader in [propread_linewise, propread]:
+        best = None
+        for i in range(repeat):
+            with open(fname, 'rU') as fin:
+                start = time.time()
+                items = reader(fin)
+                elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[reader.__name__] = items
+        print "%-20s %7.3f s  %d items" % (reader.__name__, best, len(items))
+
+    if results['propread'] != results['propread_linewise']:
+        print "ERROR: readers returned different items"
+
+def benchmark_encode(size=1000000, repeat=3):
+    ''' Time from_unicode against the character by character encoder on generated texts '''
+    import time
+    import random
+
+    rnd = random.Random(1)
+    ascii = [unichr(c) for c in range(32, 127)]
+    latin = [unichr(c) for c in range(0xc0, 0x100)]
+    nonlatin = [unichr(c) for c in range(0x410, 0x450) + range(0x4e00, 0x4e80)]
+    samples = [
+        ('mostly-ASCII', [(ascii, 0.95), (latin, 0.03), (nonlatin, 0.02)]),
+        ('mostly-Latin-1', [(ascii, 0.3), (latin, 0.65), (nonlatin, 0.05)]),
+        ('mostly-non-Latin', [(ascii, 0.2), (latin, 0.05), (nonlatin, 0.75)]),
+    ]
+
+    for name, mix in samples:
+        chars = []
+        for alphabet, share in mix:
+            chars += [rnd.choice(alphabet) for i in xrange(int(size * share))]
+        rnd.shuffle(chars)
+        text = u''.join(chars)
+
+        results = {}
+        for encoder in [from_unicode_charwise, from_unicode]:
+            best = None
+            for i in range(repeat):
+                start = time.time()
+                results[encoder.__name__] = encoder(text)
+                elapsed = time.time() - start
+                best = elapsed if best is None else min(best, elapsed)
+            print "%-16s %-22s %7.3f s  %6.2f Mchar/s" % (name, encoder.__name__, best, len(text) / best / 1e6)
+
+        if results['from_unicode'] != results['from_unicode_charwise']:
+            print "ERROR: encoders returned different output"
 
 if __name__ == "__main__":
-    #with open('msg_bundle_hu.properties.orig', 'rU') as fin:
-    with open('msg_bundle_ru.properties', 'rU') as fin:
-        items = propread(fin)
+    import sys
+
+    #fnames = ['msg_bundle_hu.properties.orig']
+    fnames = sys.argv[1:] or ['msg_bundle_ru.properties']
+    for fname in fnames:
+        print fname
+        benchmark_read(fname)
 
-    with open('res', 'wb') as fout:
-        propsave(fout, items)
\ No newline at end of file
+    benchmark_encode()
\ No newline at end of file
@@ -1,3 +1,4 @@
 pyside-uic -o ui_mainwindow.py ui_mainwindow.ui
 pyside-uic -o ui_options.py ui_options.ui
+pyside-uic -o ui_issues.py ui_issues.ui
 pause
\ No newline at end of file
@@ -0,0 +1,277 @@
+# Apropy - a Java properties file editor in python.
+# Copyright (C) 2016 Andras Szell
+
+import re
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import izip, count
+
+SEPARATOR = u'\n'
+FIELDS = 3          # key, original, translation
+KEY, ORIGINAL, TRANSLATION = range(FIELDS)
+ALL_COLUMNS = (KEY, ORIGINAL, TRANSLATION)
+
+# a lookbehind or an absolute anchor would see the neighbouring fields in the corpus
+CORPUS_UNSAFE_RE = re.compile(r'\(\?<|\\A|\\Z')
+
+class LRUCache(object):
+    ''' Small thread safe least recently used cache '''
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.pop(key, None)
+            if value is not None:
+                self.items[key] = value
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.items.pop(key, None)
+            self.items[key] = value
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+patterns = LRUCache(64)
+
+class SearchQuery(object):
+    '''
+    What to look for and where. Matching is always case-insensitive.
+    Raises re.error for an invalid regular expression.
+    '''
+    def __init__(self, text, regex=False, whole_word=False, columns=ALL_COLUMNS):
+        # escapes like \S or \W must keep their case, IGNORECASE takes care of the pattern
+        self.text = text if regex else text.lower()
+        self.regex = regex
+        self.whole_word = whole_word
+        self.columns = tuple(sorted(columns))
+        self.key = (self.text, regex, whole_word, self.columns)
+
+        self.pattern = None
+        if regex or whole_word:
+            expr = self.text if regex else re.escape(self.text)
+            if whole_word:
+                expr = r'\b(?:%s)\b' % expr
+            self.pattern = patterns.get(expr)
+            if self.pattern is None:
+                self.pattern = re.compile(expr, re.IGNORECASE | re.UNICODE | re.MULTILINE)
+                patterns.put(expr, self.pattern)
+
+    def test(self, text):
+        ''' :param text: lowercased text of a field '''
+        if self.pattern is None:
+            return self.text in text
+        return self.pattern.search(text) is not None
+
+    def refines(self, other):
+        ''' True if every match of this query is also a match of the other one '''
+        return (self.pattern is None and other.pattern is None and self.columns == other.columns
+                and other.text in self.text)
+
+class SearchIndex(object):
+    '''
+    Case-insensitive search over the key, original and translation of every original key.
+    All the texts are kept lowercased in one string which is searched with find() or a compiled
+    pattern, so the Python work of a query is proportional to the number of matching keys,
+    not to the bundle size.
+    Keys whose translation changed since the index was built are marked stale and checked one by one,
+    the index is rebuilt by refresh() when there are many of them.
+    Results are cached while the index does not change; a query extending a cached one only
+    re-tests the keys found by that.
+    '''
+    REBUILD_LIMIT = 1000
+    REFINE_LIMIT = 10000    # above this many keys to re-test a full scan is faster
+
+    def __init__(self):
+        self.origins = {}
+        self.trans = {}
+        self.keys = []              # indexed keys in origins order
+        self.rows = {}              # position of each key in keys
+        self.starts = array('l', [0])   # start of each field of each key in corpus, and the end
+        self.corpus = u''
+        self.stale = set()
+        self.version = 0            # increased on every change, results are cached by it
+        self.results = LRUCache(32)
+        self.built = True
+
+    def reset(self, origins, trans):
+        ''' Use the given dictionaries, the index is built only by the next refresh() '''
+        self.build({}, {})
+        self.origins = origins
+        self.trans = trans
+        self.built = False
+
+    def build(self, origins, trans):
+        self.origins = origins
+        self.trans = trans
+        self.keys = []
+        self.rows = {}
+        self.starts = array('l', [0])
+        self.corpus = u''
+        self.stale = set()
+        self.version += 1
+        self.results.clear()
+        self.built = True
+
+        # iterated, not looked up: a lazily parsed dictionary decodes its items in batches then
+        translations = dict((key, item.trans) for key, item in trans.iteritems())
+        self.append(origins.iteritems(), translations)
+
+    def append(self, items, translations=None):
+        ''' Index (key, original item) pairs added to the end of origins since the index was built.
+            New objects replace the old ones, so searches running meanwhile are not disturbed.
+        :param translations: key -> translation text, the items of trans are used if not given
+        '''
+        if not self.built:
+            return
+
+        keys = []
+        parts = []
+        starts = array('l', self.starts)
+        pos = starts.pop()
+        for key, item in items:
+            if translations is not None:
+                text = translations.get(key, u'')
+            else:
+                titem = self.trans.get(key)
+                text = titem.trans if titem is not None else u''
+            for field in (key, item.trans, text):
+                starts.append(pos)
+                parts.append(field)
+                pos += len(field) + 1
+            keys.append(key)
+        if not keys:
+            return
+        starts.append(pos)
+
+        rows = dict(self.rows)
+        rows.update(izip(keys, count(len(self.keys))))
+        # a query typed in a line can not contain the separator, so no plain match can span two fields
+        corpus = SEPARATOR.join(parts).lower()
+        if self.keys:
+            corpus = self.corpus + SEPARATOR + corpus
+
+        self.keys, self.rows, self.starts, self.corpus = self.keys + keys, rows, starts, corpus
+        self.version += 1
+        self.results.clear()
+
+    def update(self, key):
+        ''' Translation of key changed '''
+        if key in self.rows:
+            self.stale.add(key)
+            self.version += 1
+
+    def refresh(self):
+        ''' Build the index if it was reset or many keys are stale. Not to be called while a search
+            is running in an other thread, searches started earlier keep using the old index though. '''
+        if not self.built or len(self.stale) > self.REBUILD_LIMIT:
+            self.build(self.origins, self.trans)
+
+    def search(self, query, cancelled=None, first_page=None, page_size=200):
+        '''
+        Can run in a worker thread: the index is read through local references, so a concurrent
+        build() or update() does not disturb it.
+        :param query: SearchQuery
+        :param cancelled: callable, the search is abandoned (returning None) when it returns True
+        :param first_page: callable, called with the first page_size matches as soon as they are found
+        :return: the keys matching query, in origins order
+        '''
+        version = self.version
+        corpus, starts, keys, rows = self.corpus, self.starts, self.keys, self.rows
+        origins, trans = self.origins, self.trans
+        stale = set(self.stale)
+        columns = query.columns
+
+        def field(f):
+            return corpus[starts[f]:starts[f + 1] - 1]
+
+        def matches(key):
+            if key in stale:
+                item = trans.get(key)
+                texts = key, origins[key].trans, item.trans if item is not None else u''
+                return any(query.test(texts[c].lower()) for c in columns)
+            f = rows[key] * FIELDS
+            return any(query.test(field(f + c)) for c in columns)
+
+        cached = self.results.get(query.key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        previous = self.refined(query, version)
+        if previous is not None:
+            found = [key for key in previous if matches(key)]
+            self.results.put(query.key, (version, found))
+            return found
+
+        if query.pattern is None:
+            text = query.text
+            def candidate(pos):
+                return corpus.find(text, pos)
+            verify = False
+        elif CORPUS_UNSAFE_RE.search(query.text):
+            # every field has to be tested on its own
+            def candidate(pos):
+                return pos if pos < len(corpus) else -1
+            verify = True
+        else:
+            search = query.pattern.search
+            def candidate(pos):
+                m = search(corpus, pos)
+                return -1 if m is None else m.start()
+            # a pattern may match across the separator, so a hit is only a candidate
+            verify = True
+
+        found = []
+        nfields = len(starts) - 1
+        pos = candidate(0)
+        while pos != -1:
+            f = bisect_right(starts, pos) - 1
+            if f >= nfields:
+                break
+            if f % FIELDS in columns and (not verify or query.test(field(f))):
+                row = f // FIELDS
+                found.append(row)
+                if len(found) % page_size == 0:
+                    if cancelled is not None and cancelled():
+                        return None
+                    if first_page is not None and len(found) == page_size:
+                        first_page([keys[r] for r in found if keys[r] not in stale])
+                # continue at the next key, one match per key is enough
+                f = (row + 1) * FIELDS
+            else:
+                f += 1
+                if f % 4096 == 0 and cancelled is not None and cancelled():
+                    return None
+            if f >= nfields:
+                break
+            pos = candidate(starts[f])
+
+        if stale:
+            # texts of stale keys may have changed since the corpus was built
+            found = [row for row in found if keys[row] not in stale]
+            found += [rows[key] for key in stale if matches(key)]
+            found.sort()
+        found = [keys[row] for row in found]
+        self.results.put(query.key, (version, found))
+        return found
+
+    def refined(self, query, version):
+        ''' :return: the smallest cached result of an earlier query this one refines, or None '''
+        with self.results.lock:
+            entries = self.results.items.items()
+        best = None
+        for key, (ver, found) in entries:
+            if ver != version or len(found) > self.REFINE_LIMIT:
+                continue
+            if query.refines(SearchQuery(*key)) and (best is None or len(found) < len(best)):
+                best = found
+        return best
@@ -0,0 +1,71 @@
+# Apropy - a Java properties file editor in python.
+# Copyright (C) 2016 Andras Szell
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+
+logger = logging.getLogger("apropy")
+
+class SpanStats(object):
+    __slots__ = ('count', 'total', 'last', 'longest')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.longest = 0.0
+
+class Timings(object):
+    '''
+    Durations of named spans of work, e.g. load, parse, filter, save or paint: the count, total,
+    last and longest one of each. A span is written to the log at debug level if it took at least
+    log_threshold seconds, so frequent short ones (paint) are only summarised.
+    Spans can be added from worker threads too.
+    '''
+    def __init__(self, log_threshold=0.005):
+        self.log_threshold = log_threshold
+        self.stats = OrderedDict()      # span name -> SpanStats, in the order first seen
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, detail=''):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, time.time() - start, detail)
+
+    def add(self, name, seconds, detail=''):
+        ''' Record a span measured elsewhere, e.g. by a worker thread '''
+        with self.lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = SpanStats()
+            stats.count += 1
+            stats.total += seconds
+            stats.last = seconds
+            stats.longest = max(stats.longest, seconds)
+        if seconds >= self.log_threshold:
+            logger.debug("Timing %s: %.1f ms%s" % (name, seconds * 1000, ' (%s)' % detail if detail else ''))
+
+    def readout(self, names=None):
+        ''' :return: last duration of the given spans (all by default), e.g. "filter 12 ms  paint 3 ms" '''
+        with self.lock:
+            items = [(name, self.stats[name].last) for name in (names or self.stats) if name in self.stats]
+        return '  '.join('%s %s' % (name, format_seconds(seconds)) for name, seconds in items)
+
+    def summary(self):
+        ''' :return: lines of the statistics of every span, for the log '''
+        with self.lock:
+            return ["%-12s %6d x  total %9.3f s  mean %8.2f ms  longest %8.2f ms" %
+                    (name, s.count, s.total, s.total * 1000 / s.count, s.longest * 1000)
+                    for name, s in self.stats.iteritems()]
+
+def format_seconds(seconds):
+    return '%.2f s' % seconds if seconds >= 1 else '%d ms' % round(seconds * 1000)
+
+# spans of the whole application
+timings = Timings()
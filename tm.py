@@ -0,0 +1,171 @@
+# Apropy - a Java properties file editor in python.
+# Copyright (C) 2016 Andras Szell
+
+import re
+import math
+import heapq
+from array import array
+from difflib import SequenceMatcher
+from operator import itemgetter
+
+from prop import propread
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+def words(text):
+    return WORD_RE.findall(text.lower())
+
+def tokenize(text):
+    return set(words(text))
+
+class Suggestion(object):
+    __slots__ = ('score', 'ref', 'source', 'target')
+
+    def __init__(self, score, ref, source, target):
+        self.score = score      # similarity of the source to the text searched, 0..1
+        self.ref = ref          # where the segment comes from
+        self.source = source
+        self.target = target
+
+class TranslationMemory(object):
+    '''
+    Original -> translation segments with an inverted index of their words, for fuzzy lookups.
+    A search scores the segments sharing the rarest words of the text by the idf weight of the
+    shared words, then the best ones are compared word by word with difflib. Common words are
+    used only while the number of postings read stays below CANDIDATE_LIMIT, so a query costs
+    about the same at any number of segments.
+    Segments are identified by a ref (the key, or the file and key for imported ones); add() with
+    a known ref updates the segment in place.
+    '''
+    CANDIDATE_LIMIT = 20000     # postings read per search
+    RESCORE = 50                # best candidates compared word by word
+    MIN_SCORE = 0.5
+
+    def __init__(self):
+        self.refs = []
+        self.sources = []
+        self.targets = []
+        self.ids = {}           # ref -> segment id
+        self.index = {}         # word -> array of segment ids containing it
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ref, source, target):
+        ''' Add or update a segment, an empty target removes it from the results '''
+        sid = self.ids.get(ref)
+        if sid is not None:
+            if self.sources[sid] == source:
+                self.targets[sid] = target
+                return
+            # source changed: the old segment is left unused
+            self.targets[sid] = u''
+        if not target:
+            if sid is not None:
+                del self.ids[ref]
+            return
+
+        sid = len(self.sources)
+        self.ids[ref] = sid
+        self.refs.append(ref)
+        self.sources.append(source)
+        self.targets.append(target)
+        for token in tokenize(source):
+            postings = self.index.get(token)
+            if postings is None:
+                postings = self.index[token] = array('i')
+            postings.append(sid)
+
+    def add_pairs(self, origins, trans, prefix=''):
+        ''' Add every translated key of a bundle, refs are prefix + key '''
+        for key, item in trans.iteritems():
+            orig = origins.get(key)
+            if orig is not None and item.trans.strip():
+                self.add(prefix + key, orig.trans, item.trans)
+
+    def add_files(self, origname, transname):
+        ''' Add a bundle read from disk, refs are the file name and the key '''
+        with open(origname, 'rb') as forig:
+            origins = propread(forig)
+        with open(transname, 'rb') as ftrans:
+            trans = propread(ftrans)
+        for item in origins.itervalues():
+            item.trans = item.trans.lstrip(' ')
+        self.add_pairs(origins, trans, transname + ':')
+
+    def search(self, text, k=5, exclude=None):
+        '''
+        :param exclude: ref not to return, e.g. the key of the text
+        :return: at most k Suggestions with score at least MIN_SCORE, best first
+        '''
+        sequence = words(text)
+        tokens = set(sequence)
+        if not tokens:
+            return []
+        n = float(len(self.sources)) + 1
+        weights = []
+        for token in tokens:
+            postings = self.index.get(token)
+            if postings is not None:
+                weights.append((len(postings), math.log(n / len(postings)), postings))
+        # rarest words first
+        weights.sort(key=itemgetter(0))
+
+        scores = {}
+        read = 0
+        for df, weight, postings in weights:
+            if read and read + df > self.CANDIDATE_LIMIT:
+                break
+            read += df
+            for sid in postings:
+                scores[sid] = scores.get(sid, 0.0) + weight
+
+        targets = self.targets
+        candidates = heapq.nlargest(self.RESCORE, (item for item in scores.iteritems() if targets[item[0]]),
+                                    key=itemgetter(1))
+        # the text is the second sequence, that is the one difflib prepares only once
+        matcher = SequenceMatcher(None, None, sequence, autojunk=False)
+        results = []
+        seen = set()
+        for sid, weight in candidates:
+            ref, source, target = self.refs[sid], self.sources[sid], targets[sid]
+            if ref == exclude or (source, target) in seen:
+                continue
+            seen.add((source, target))
+            matcher.set_seq1(words(source))
+            if matcher.real_quick_ratio() < self.MIN_SCORE or matcher.quick_ratio() < self.MIN_SCORE:
+                continue
+            score = matcher.ratio()
+            if score >= self.MIN_SCORE:
+                results.append(Suggestion(score, ref, source, target))
+        results.sort(key=lambda s: -s.score)
+        return results[:k]
+
+def benchmark_tm(size=500000, queries=200):
+    ''' Time building and searching a memory of random sentences '''
+    import time
+    import random
+
+    random.seed(1)
+    words = [u'word%d' % i for i in range(20000)]
+    # a few very common words, like in real texts
+    common = [u'the', u'a', u'of', u'to', u'is', u'file', u'error']
+    def sentence():
+        return u' '.join(random.choice(common) if random.random() < 0.3 else random.choice(words)
+                         for i in range(random.randint(3, 15)))
+
+    sources = [sentence() for i in xrange(size)]
+    tm = TranslationMemory()
+    start = time.time()
+    for i, source in enumerate(sources):
+        tm.add(str(i), source, u'x')
+    print "build    %7.3f s  %d segments" % (time.time() - start, len(tm))
+
+    texts = [tm.sources[random.randrange(size)] for i in range(queries)]
+    start = time.time()
+    for text in texts:
+        tm.search(text)
+    print "search   %7.3f ms per query" % ((time.time() - start) * 1000 / queries)
+
+if __name__ == "__main__":
+    benchmark_tm()
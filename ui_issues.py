@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'ui_issues.ui'
+#
+# Created: Sun Oct 18 15:31:07 2026
+#      by: pyside-uic 0.2.14 running on PySide 1.1.1
+#
+# WARNING! All changes made in this file will be lost!
+
+from PySide import QtCore, QtGui
+
+class Ui_IssuesDialog(object):
+    def setupUi(self, IssuesDialog):
+        IssuesDialog.setObjectName("IssuesDialog")
+        IssuesDialog.resize(640, 420)
+        self.verticalLayout = QtGui.QVBoxLayout(IssuesDialog)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.horizontalLayout = QtGui.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.label = QtGui.QLabel(IssuesDialog)
+        self.label.setObjectName("label")
+        self.horizontalLayout.addWidget(self.label)
+        self.ruleCombo = QtGui.QComboBox(IssuesDialog)
+        self.ruleCombo.setObjectName("ruleCombo")
+        self.horizontalLayout.addWidget(self.ruleCombo)
+        self.label_2 = QtGui.QLabel(IssuesDialog)
+        self.label_2.setObjectName("label_2")
+        self.horizontalLayout.addWidget(self.label_2)
+        self.filterEdit = QtGui.QLineEdit(IssuesDialog)
+        self.filterEdit.setObjectName("filterEdit")
+        self.horizontalLayout.addWidget(self.filterEdit)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+        self.issueList = QtGui.QListWidget(IssuesDialog)
+        self.issueList.setUniformItemSizes(True)
+        self.issueList.setObjectName("issueList")
+        self.verticalLayout.addWidget(self.issueList)
+        self.horizontalLayout_2 = QtGui.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.countLabel = QtGui.QLabel(IssuesDialog)
+        self.countLabel.setText("")
+        self.countLabel.setObjectName("countLabel")
+        self.horizontalLayout_2.addWidget(self.countLabel)
+        spacerItem = QtGui.QSpacerItem(40, 20, QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Minimum)
+        self.horizontalLayout_2.addItem(spacerItem)
+        self.closeButton = QtGui.QPushButton(IssuesDialog)
+        self.closeButton.setObjectName("closeButton")
+        self.horizontalLayout_2.addWidget(self.closeButton)
+        self.verticalLayout.addLayout(self.horizontalLayout_2)
+        self.label.setBuddy(self.ruleCombo)
+        self.label_2.setBuddy(self.filterEdit)
+
+        self.retranslateUi(IssuesDialog)
+        QtCore.QMetaObject.connectSlotsByName(IssuesDialog)
+
+    def retranslateUi(self, IssuesDialog):
+        IssuesDialog.setWindowTitle(QtGui.QApplication.translate("IssuesDialog", "Translation issues", None, QtGui.QApplication.UnicodeUTF8))
+        self.label.setText(QtGui.QApplication.translate("IssuesDialog", "&Rule:", None, QtGui.QApplication.UnicodeUTF8))
+        self.label_2.setText(QtGui.QApplication.translate("IssuesDialog", "&Filter:", None, QtGui.QApplication.UnicodeUTF8))
+        self.closeButton.setText(QtGui.QApplication.translate("IssuesDialog", "Close", None, QtGui.QApplication.UnicodeUTF8))
+
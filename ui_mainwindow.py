@@ -32,6 +32,18 @@ class Ui_MainWindow(object):
         self.gridLayout = QtGui.QGridLayout(self.TranslateWidget)
         self.gridLayout.setContentsMargins(0, 0, 0, 0)
         self.gridLayout.setObjectName("gridLayout")
+        self.horizontalLayout_8 = QtGui.QHBoxLayout()
+        self.horizontalLayout_8.setObjectName("horizontalLayout_8")
+        self.oldOrigEdit = QtGui.QPlainTextEdit(self.TranslateWidget)
+        sizePolicy = QtGui.QSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(1)
+        sizePolicy.setHeightForWidth(self.oldOrigEdit.sizePolicy().hasHeightForWidth())
+        self.oldOrigEdit.setSizePolicy(sizePolicy)
+        self.oldOrigEdit.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.oldOrigEdit.setReadOnly(True)
+        self.oldOrigEdit.setObjectName("oldOrigEdit")
+        self.horizontalLayout_8.addWidget(self.oldOrigEdit)
         self.origEdit = QtGui.QPlainTextEdit(self.TranslateWidget)
         sizePolicy = QtGui.QSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
         sizePolicy.setHorizontalStretch(0)
@@ -41,7 +53,8 @@ class Ui_MainWindow(object):
         self.origEdit.setFocusPolicy(QtCore.Qt.NoFocus)
         self.origEdit.setReadOnly(True)
         self.origEdit.setObjectName("origEdit")
-        self.gridLayout.addWidget(self.origEdit, 3, 0, 1, 1)
+        self.horizontalLayout_8.addWidget(self.origEdit)
+        self.gridLayout.addLayout(self.horizontalLayout_8, 3, 0, 1, 1)
         self.commentEdit = QtGui.QPlainTextEdit(self.TranslateWidget)
         sizePolicy = QtGui.QSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
         sizePolicy.setHorizontalStretch(0)
@@ -51,15 +64,31 @@ class Ui_MainWindow(object):
         self.commentEdit.setFocusPolicy(QtCore.Qt.NoFocus)
         self.commentEdit.setReadOnly(True)
         self.commentEdit.setObjectName("commentEdit")
-        self.gridLayout.addWidget(self.commentEdit, 5, 0, 1, 2)
+        self.gridLayout.addWidget(self.commentEdit, 5, 0, 1, 1)
         self.horizontalLayout_3 = QtGui.QHBoxLayout()
         self.horizontalLayout_3.setObjectName("horizontalLayout_3")
+        self.localeLabel = QtGui.QLabel(self.TranslateWidget)
+        self.localeLabel.setObjectName("localeLabel")
+        self.horizontalLayout_3.addWidget(self.localeLabel)
+        self.localeCombo = QtGui.QComboBox(self.TranslateWidget)
+        self.localeCombo.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.localeCombo.setObjectName("localeCombo")
+        self.horizontalLayout_3.addWidget(self.localeCombo)
+        self.columnsButton = QtGui.QToolButton(self.TranslateWidget)
+        self.columnsButton.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.columnsButton.setPopupMode(QtGui.QToolButton.InstantPopup)
+        self.columnsButton.setObjectName("columnsButton")
+        self.horizontalLayout_3.addWidget(self.columnsButton)
         spacerItem = QtGui.QSpacerItem(40, 20, QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Minimum)
         self.horizontalLayout_3.addItem(spacerItem)
         self.untransOnlyBox = QtGui.QCheckBox(self.TranslateWidget)
         self.untransOnlyBox.setFocusPolicy(QtCore.Qt.NoFocus)
         self.untransOnlyBox.setObjectName("untransOnlyBox")
         self.horizontalLayout_3.addWidget(self.untransOnlyBox)
+        self.outdatedOnlyBox = QtGui.QCheckBox(self.TranslateWidget)
+        self.outdatedOnlyBox.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.outdatedOnlyBox.setObjectName("outdatedOnlyBox")
+        self.horizontalLayout_3.addWidget(self.outdatedOnlyBox)
         self.gridLayout.addLayout(self.horizontalLayout_3, 0, 1, 1, 1)
         self.transEdit = QtGui.QPlainTextEdit(self.TranslateWidget)
         sizePolicy = QtGui.QSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
@@ -79,10 +108,39 @@ class Ui_MainWindow(object):
         self.filterEdit.setText("")
         self.filterEdit.setObjectName("filterEdit")
         self.horizontalLayout_2.addWidget(self.filterEdit)
+        self.scopeCombo = QtGui.QComboBox(self.TranslateWidget)
+        self.scopeCombo.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.scopeCombo.setObjectName("scopeCombo")
+        self.scopeCombo.addItem("")
+        self.scopeCombo.addItem("")
+        self.scopeCombo.addItem("")
+        self.scopeCombo.addItem("")
+        self.horizontalLayout_2.addWidget(self.scopeCombo)
+        self.wordBox = QtGui.QCheckBox(self.TranslateWidget)
+        self.wordBox.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.wordBox.setObjectName("wordBox")
+        self.horizontalLayout_2.addWidget(self.wordBox)
+        self.regexBox = QtGui.QCheckBox(self.TranslateWidget)
+        self.regexBox.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.regexBox.setObjectName("regexBox")
+        self.horizontalLayout_2.addWidget(self.regexBox)
         self.gridLayout.addLayout(self.horizontalLayout_2, 0, 0, 1, 1)
         self.label_2 = QtGui.QLabel(self.TranslateWidget)
         self.label_2.setObjectName("label_2")
         self.gridLayout.addWidget(self.label_2, 4, 0, 1, 1)
+        self.label_5 = QtGui.QLabel(self.TranslateWidget)
+        self.label_5.setObjectName("label_5")
+        self.gridLayout.addWidget(self.label_5, 4, 1, 1, 1)
+        self.suggestionList = QtGui.QListWidget(self.TranslateWidget)
+        sizePolicy = QtGui.QSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(1)
+        sizePolicy.setHeightForWidth(self.suggestionList.sizePolicy().hasHeightForWidth())
+        self.suggestionList.setSizePolicy(sizePolicy)
+        self.suggestionList.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.suggestionList.setWordWrap(True)
+        self.suggestionList.setObjectName("suggestionList")
+        self.gridLayout.addWidget(self.suggestionList, 5, 1, 1, 1)
         self.horizontalLayout_7 = QtGui.QHBoxLayout()
         self.horizontalLayout_7.setObjectName("horizontalLayout_7")
         self.label_3 = QtGui.QLabel(self.TranslateWidget)
@@ -121,6 +179,10 @@ class Ui_MainWindow(object):
         self.menubar.setObjectName("menubar")
         self.menu_File = QtGui.QMenu(self.menubar)
         self.menu_File.setObjectName("menu_File")
+        self.menu_Edit = QtGui.QMenu(self.menubar)
+        self.menu_Edit.setObjectName("menu_Edit")
+        self.menu_Tools = QtGui.QMenu(self.menubar)
+        self.menu_Tools.setObjectName("menu_Tools")
         self.menu_Help = QtGui.QMenu(self.menubar)
         self.menu_Help.setObjectName("menu_Help")
         MainWindow.setMenuBar(self.menubar)
@@ -131,29 +193,70 @@ class Ui_MainWindow(object):
         self.action_Open.setObjectName("action_Open")
         self.action_Save = QtGui.QAction(MainWindow)
         self.action_Save.setObjectName("action_Save")
+        self.action_ImportTM = QtGui.QAction(MainWindow)
+        self.action_ImportTM.setObjectName("action_ImportTM")
+        self.action_Undo = QtGui.QAction(MainWindow)
+        self.action_Undo.setObjectName("action_Undo")
+        self.action_Redo = QtGui.QAction(MainWindow)
+        self.action_Redo.setObjectName("action_Redo")
+        self.action_Inconsistent = QtGui.QAction(MainWindow)
+        self.action_Inconsistent.setObjectName("action_Inconsistent")
+        self.action_Issues = QtGui.QAction(MainWindow)
+        self.action_Issues.setObjectName("action_Issues")
         self.action_About = QtGui.QAction(MainWindow)
         self.action_About.setObjectName("action_About")
         self.menu_File.addAction(self.action_Open)
         self.menu_File.addAction(self.action_Save)
+        self.menu_File.addAction(self.action_ImportTM)
+        self.menu_Edit.addAction(self.action_Undo)
+        self.menu_Edit.addAction(self.action_Redo)
+        self.menu_Tools.addAction(self.action_Inconsistent)
+        self.menu_Tools.addAction(self.action_Issues)
         self.menu_Help.addAction(self.action_About)
         self.menubar.addAction(self.menu_File.menuAction())
+        self.menubar.addAction(self.menu_Edit.menuAction())
+        self.menubar.addAction(self.menu_Tools.menuAction())
         self.menubar.addAction(self.menu_Help.menuAction())
 
+        self.localeLabel.setBuddy(self.localeCombo)
+
         self.retranslateUi(MainWindow)
         QtCore.QMetaObject.connectSlotsByName(MainWindow)
         MainWindow.setTabOrder(self.tableView, self.transEdit)
 
     def retranslateUi(self, MainWindow):
         MainWindow.setWindowTitle(QtGui.QApplication.translate("MainWindow", "apropy", None, QtGui.QApplication.UnicodeUTF8))
+        self.oldOrigEdit.setToolTip(QtGui.QApplication.translate("MainWindow", "Original the translation was made from", None, QtGui.QApplication.UnicodeUTF8))
+        self.localeLabel.setText(QtGui.QApplication.translate("MainWindow", "&Locale:", None, QtGui.QApplication.UnicodeUTF8))
+        self.columnsButton.setText(QtGui.QApplication.translate("MainWindow", "Columns", None, QtGui.QApplication.UnicodeUTF8))
         self.untransOnlyBox.setText(QtGui.QApplication.translate("MainWindow", "show &untranslated only", None, QtGui.QApplication.UnicodeUTF8))
+        self.outdatedOnlyBox.setToolTip(QtGui.QApplication.translate("MainWindow", "Translations whose original changed since they were saved", None, QtGui.QApplication.UnicodeUTF8))
+        self.outdatedOnlyBox.setText(QtGui.QApplication.translate("MainWindow", "show &outdated only", None, QtGui.QApplication.UnicodeUTF8))
         self.label.setText(QtGui.QApplication.translate("MainWindow", "Filter (CTRL+F):", None, QtGui.QApplication.UnicodeUTF8))
+        self.scopeCombo.setItemText(0, QtGui.QApplication.translate("MainWindow", "everywhere", None, QtGui.QApplication.UnicodeUTF8))
+        self.scopeCombo.setItemText(1, QtGui.QApplication.translate("MainWindow", "in keys", None, QtGui.QApplication.UnicodeUTF8))
+        self.scopeCombo.setItemText(2, QtGui.QApplication.translate("MainWindow", "in originals", None, QtGui.QApplication.UnicodeUTF8))
+        self.scopeCombo.setItemText(3, QtGui.QApplication.translate("MainWindow", "in translations", None, QtGui.QApplication.UnicodeUTF8))
+        self.wordBox.setText(QtGui.QApplication.translate("MainWindow", "&whole word", None, QtGui.QApplication.UnicodeUTF8))
+        self.regexBox.setText(QtGui.QApplication.translate("MainWindow", "rege&x", None, QtGui.QApplication.UnicodeUTF8))
+        self.label_5.setText(QtGui.QApplication.translate("MainWindow", "Suggestions (double-click to use):", None, QtGui.QApplication.UnicodeUTF8))
         self.label_2.setText(QtGui.QApplication.translate("MainWindow", "Comments:", None, QtGui.QApplication.UnicodeUTF8))
         self.label_3.setText(QtGui.QApplication.translate("MainWindow", "Original:", None, QtGui.QApplication.UnicodeUTF8))
         self.copyButton.setText(QtGui.QApplication.translate("MainWindow", ">> &copy >>", None, QtGui.QApplication.UnicodeUTF8))
         self.label_4.setText(QtGui.QApplication.translate("MainWindow", "Translated:", None, QtGui.QApplication.UnicodeUTF8))
         self.menu_File.setTitle(QtGui.QApplication.translate("MainWindow", "&File", None, QtGui.QApplication.UnicodeUTF8))
+        self.menu_Edit.setTitle(QtGui.QApplication.translate("MainWindow", "&Edit", None, QtGui.QApplication.UnicodeUTF8))
+        self.menu_Tools.setTitle(QtGui.QApplication.translate("MainWindow", "&Tools", None, QtGui.QApplication.UnicodeUTF8))
         self.menu_Help.setTitle(QtGui.QApplication.translate("MainWindow", "&Help", None, QtGui.QApplication.UnicodeUTF8))
         self.action_Open.setText(QtGui.QApplication.translate("MainWindow", "&Open / Options", None, QtGui.QApplication.UnicodeUTF8))
         self.action_Save.setText(QtGui.QApplication.translate("MainWindow", "&Save translation", None, QtGui.QApplication.UnicodeUTF8))
+        self.action_ImportTM.setText(QtGui.QApplication.translate("MainWindow", "&Import translation memory...", None, QtGui.QApplication.UnicodeUTF8))
+        self.action_Undo.setText(QtGui.QApplication.translate("MainWindow", "&Undo", None, QtGui.QApplication.UnicodeUTF8))
+        self.action_Undo.setShortcut(QtGui.QApplication.translate("MainWindow", "Ctrl+Z", None, QtGui.QApplication.UnicodeUTF8))
+        self.action_Redo.setText(QtGui.QApplication.translate("MainWindow", "&Redo", None, QtGui.QApplication.UnicodeUTF8))
+        self.action_Redo.setShortcut(QtGui.QApplication.translate("MainWindow", "Ctrl+Y", None, QtGui.QApplication.UnicodeUTF8))
+        self.action_Inconsistent.setText(QtGui.QApplication.translate("MainWindow", "Show &inconsistent translations", None, QtGui.QApplication.UnicodeUTF8))
+        self.action_Issues.setText(QtGui.QApplication.translate("MainWindow", "Show translation i&ssues...", None, QtGui.QApplication.UnicodeUTF8))
+        self.action_Issues.setShortcut(QtGui.QApplication.translate("MainWindow", "F8", None, QtGui.QApplication.UnicodeUTF8))
         self.action_About.setText(QtGui.QApplication.translate("MainWindow", "&About", None, QtGui.QApplication.UnicodeUTF8))
 
@@ -59,6 +59,12 @@ class Ui_OptionsDialog(object):
         self.copyCommentBox = QtGui.QCheckBox(self.optionsBox)
         self.copyCommentBox.setObjectName("copyCommentBox")
         self.gridLayout_2.addWidget(self.copyCommentBox, 1, 0, 1, 1)
+        self.lazyLoadBox = QtGui.QCheckBox(self.optionsBox)
+        self.lazyLoadBox.setObjectName("lazyLoadBox")
+        self.gridLayout_2.addWidget(self.lazyLoadBox, 2, 0, 1, 1)
+        self.projectBox = QtGui.QCheckBox(self.optionsBox)
+        self.projectBox.setObjectName("projectBox")
+        self.gridLayout_2.addWidget(self.projectBox, 3, 0, 1, 1)
         self.verticalLayout.addWidget(self.optionsBox)
         self.horizontalLayout = QtGui.QHBoxLayout()
         self.horizontalLayout.setObjectName("horizontalLayout")
@@ -87,6 +93,8 @@ class Ui_OptionsDialog(object):
         self.optionsBox.setTitle(QtGui.QApplication.translate("OptionsDialog", "Other options", None, QtGui.QApplication.UnicodeUTF8))
         self.cleanupBox.setText(QtGui.QApplication.translate("OptionsDialog", "Clean up translated file on save (remove translations missing from original, order as original)", None, QtGui.QApplication.UnicodeUTF8))
         self.copyCommentBox.setText(QtGui.QApplication.translate("OptionsDialog", "Copy comments from original to translated (for new translations)", None, QtGui.QApplication.UnicodeUTF8))
+        self.lazyLoadBox.setText(QtGui.QApplication.translate("OptionsDialog", "Memory-map files and parse entries only when needed (for huge bundles)", None, QtGui.QApplication.UnicodeUTF8))
+        self.projectBox.setText(QtGui.QApplication.translate("OptionsDialog", "Project mode: open every locale of the base file found next to it", None, QtGui.QApplication.UnicodeUTF8))
         self.okButton.setText(QtGui.QApplication.translate("OptionsDialog", "Ok", None, QtGui.QApplication.UnicodeUTF8))
         self.cancelButton.setText(QtGui.QApplication.translate("OptionsDialog", "Cancel", None, QtGui.QApplication.UnicodeUTF8))
 
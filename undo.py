@@ -0,0 +1,100 @@
+# Apropy - a Java properties file editor in python.
+# Copyright (C) 2016 Andras Szell
+
+from collections import deque
+
+class UndoStack(object):
+    '''
+    Undo and redo history of translation edits. A step is a list of (key, old text, new text)
+    deltas applied together, e.g. all the keys of a paste or of applying a translation to identical
+    originals. Deltas refer to keys, not rows, as rows come and go with filtering and merges.
+    The oldest steps are dropped when the texts stored take more than max_size bytes.
+    '''
+    OVERHEAD = 120      # bytes of the tuples and strings of a delta besides the characters
+    CHAR_SIZE = 4       # bytes of a unicode character, at most
+
+    def __init__(self, max_size=16 << 20):
+        self.max_size = max_size
+        self.clear()
+
+    def clear(self):
+        self.undos = deque()    # steps, last one is undone first
+        self.redos = []
+        self.size = 0           # bytes estimated for all the steps
+        self.mergeable = False  # the last step can be continued by record(merge=True)
+
+    def __len__(self):
+        return len(self.undos)
+
+    def step_size(self, step):
+        return sum(self.OVERHEAD + self.CHAR_SIZE * (len(key) + len(old) + len(new)) for key, old, new in step)
+
+    def record(self, step, merge=False):
+        '''
+        Add a step done by the user, the redo history is lost.
+        :param step: list of (key, old text, new text)
+        :param merge: the step continues the previous one if that was merged too and was about the
+            same single key, e.g. characters typed one by one
+        '''
+        step = [delta for delta in step if delta[1] != delta[2]]
+        if not step:
+            return
+        self.drop_redos()
+        if merge and self.mergeable and len(step) == 1 and step[0][0] == self.undos[-1][0][0]:
+            key, old, new = self.undos[-1][0]
+            self.size -= self.step_size(self.undos[-1])
+            self.undos.pop()
+            if old == step[0][2]:
+                # typed back to where it was
+                self.mergeable = False
+                return
+            step = [(key, old, step[0][2])]
+        self.push(step)
+        self.mergeable = merge and len(step) == 1
+
+    def end_step(self):
+        ''' The next step is not merged into the last one, e.g. an other row was selected '''
+        self.mergeable = False
+
+    def push(self, step):
+        self.undos.append(step)
+        self.size += self.step_size(step)
+        # the newest step is kept even if it is larger than the limit
+        while self.size > self.max_size and len(self.undos) > 1:
+            self.size -= self.step_size(self.undos.popleft())
+
+    def drop_redos(self):
+        for step in self.redos:
+            self.size -= self.step_size(step)
+        self.redos = []
+
+    def can_undo(self):
+        return bool(self.undos)
+
+    def can_redo(self):
+        return bool(self.redos)
+
+    def undo(self):
+        ''' :return: the last step, its deltas to be applied backwards (new -> old text) '''
+        step = self.undos.pop()
+        self.redos.append(step)
+        self.mergeable = False
+        return step
+
+    def redo(self):
+        ''' :return: the last step undone, to be applied again '''
+        step = self.redos.pop()
+        self.undos.append(step)
+        self.mergeable = False
+        return step
+
+    def forget(self, keys):
+        ''' Drop the deltas of the given keys, e.g. removed from the bundle, and the steps left empty '''
+        keys = set(keys)
+        if not keys:
+            return
+        prune = lambda steps: [s for s in ([d for d in step if d[0] not in keys] for step in steps) if s]
+        self.undos = deque(prune(self.undos))
+        self.redos = prune(self.redos)
+        self.size = sum(self.step_size(step) for step in self.undos) + sum(self.step_size(step) for step in self.redos)
+        self.mergeable = False